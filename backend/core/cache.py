@@ -0,0 +1,180 @@
+"""
+In-process caching helpers for LexiGraph
+Used to skip repeated LLM calls for lectures that were already processed
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so trivially different copies of a lecture share a cache entry
+    (whitespace runs collapsed, surrounding whitespace dropped, case folded)
+    """
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+def make_cache_key(*parts: str) -> str:
+    """Build a stable SHA-256 cache key from the given string parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+class DiskCache:
+    """
+    JSON file per entry under a directory, shared by every worker process and kept
+    across restarts; values must be JSON serializable (lists come back as tuples)
+    Holds at most max_entries files; reads refresh an entry's mtime and the least
+    recently used entries are removed first once the limit is exceeded
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1000):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        # Approximate, since other processes write to the same directory; recounted on eviction
+        self._count = sum(1 for entry in os.scandir(directory) if entry.name.endswith(".json"))
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or unreadable entry"""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return tuple(value) if isinstance(value, list) else value
+
+    def set(self, key, value):
+        """Store value under key; written to a temp file first so readers never see partial entries"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+            tmp_path = None
+        except OSError:
+            return
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        
+        with self._lock:
+            self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until max_entries remain (caller holds the lock)"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        entries.sort()
+        
+        excess = len(entries) - self.max_entries
+        for _, path in entries[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._count = min(len(entries), self.max_entries)
+
+    def discard(self, key):
+        """Drop the entry for key, if there is one"""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            return
+        with self._lock:
+            self._count = max(self._count - 1, 0)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+            self._count = 0
+
+class LRUCache:
+    """
+    Small thread-safe least-recently-used cache
+    An optional backing cache (e.g. DiskCache) is written through and consulted on misses
+    """
+
+    def __init__(self, max_entries: int = 128, backing=None):
+        self.max_entries = max_entries
+        self.backing = backing
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        
+        if self.backing is None:
+            return None
+        value = self.backing.get(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry if full"""
+        self._remember(key, value)
+        if self.backing is not None:
+            self.backing.set(key, value)
+
+    def _remember(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        """Drop the entry for key, including from the backing cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backing is not None:
+            self.backing.discard(key)
+
+    def clear(self):
+        """Drop every cached entry, including the backing cache"""
+        with self._lock:
+            self._entries.clear()
+        if self.backing is not None:
+            self.backing.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -8,14 +8,176 @@ Uses specialized agents for different tasks:
 """
 
 import os
+import re
+import atexit
+import logging
+import asyncio
+import threading
+import contextlib
+import weakref
+import importlib.resources
+import importlib.util
+from functools import cache, lru_cache
+import httpx
 from dotenv import load_dotenv
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from .utils import clean_dot_code
+from langchain_core.messages import HumanMessage, SystemMessage
+from .utils import clean_dot_code, DotStreamCleaner, summary_to_dot
+from .cache import DiskCache, LRUCache, make_cache_key, normalize_text
+from .ratelimit import AsyncRateLimiter, retry_async
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Validate and summarize in a single LLM call instead of two sequential ones
+FUSE_VALIDATION = os.getenv("FUSE_VALIDATION", "true").lower() == "true"
+
+# Build the graph straight from the summary's hyphen hierarchy instead of asking the
+# visualization agent; the LLM is still used when the summary has no usable structure
+DOT_FROM_SUMMARY = os.getenv("DOT_FROM_SUMMARY", "false").lower() == "true"
+
+INVALID_CONTENT_ERROR = "The provided content doesn't appear to be educational material suitable for creating knowledge graphs. Please provide lecture notes, tutorials, or informational content with learning concepts."
+
+CONTENT_TOO_LONG_ERROR = "Content is too long for the selected model. Please try shorter text."
+
+EMPTY_SUMMARY_ERROR = "The AI model returned an empty summary. Please try again or select a different model."
+
+# Local pre-validation: inputs below MIN_CONTENT_WORDS are rejected (the validation prompt
+# classifies "less than 100 words" as invalid); Chinese/Japanese characters count as words
+MIN_CONTENT_WORDS = 100
+_WORD_RE = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]|[^\W\u3040-\u30ff\u4e00-\u9fff]+")
+_EDUCATIONAL_MARKERS_RE = re.compile(
+    r"\b(?:lecture|lesson|course|chapter|definition|theorem|algorithm|example|introduction|"
+    r"in summary|to summarize|refers to|is defined as)\b",
+    re.IGNORECASE,
+)
+_NON_EDUCATIONAL_MARKERS_RE = re.compile(
+    r"\bdear diary\b|^\s*\[?\d{1,2}:\d{2}(?::\d{2})?\s*(?:[ap]m)?\]?\s*[-:]?\s*\w+:",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Control characters other than whitespace; a noticeable share of them means binary data
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+
+# Graph statement header ([strict] (di)graph [ID] {) that every usable DOT output contains
+_DOT_KEYWORD_RE = re.compile(r'\b(?:di)?graph\s*(?:"[^"\n]*"|[\w.]+)?\s*\{', re.IGNORECASE)
+
+# Outbound LLM call limits: requests started per minute (0 = unlimited) and attempts per call
+LLM_RATE_LIMITER = AsyncRateLimiter(int(os.getenv("LLM_RPM", "0")))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+
+# Cap on requests in flight per model (0 = unlimited), so bursts queue here instead of
+# running into provider rate limits and paying for retries
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+# Per event loop, since asyncio semaphores can only be waited on from one loop
+_model_semaphores = weakref.WeakKeyDictionary()
+
+# Optional directory persisting both caches below across restarts and worker processes,
+# capped at PIPELINE_CACHE_MAX_ENTRIES files per cache
+PIPELINE_CACHE_DIR = os.getenv("PIPELINE_CACHE_DIR")
+PIPELINE_CACHE_MAX_ENTRIES = int(os.getenv("PIPELINE_CACHE_MAX_ENTRIES", "1000"))
+
+def _disk_cache(name: str):
+    if not PIPELINE_CACHE_DIR:
+        return None
+    return DiskCache(os.path.join(PIPELINE_CACHE_DIR, name), max_entries=PIPELINE_CACHE_MAX_ENTRIES)
+
+# Completed (summary, dot_code) results keyed on provider, model, prompts and normalized input
+RESPONSE_CACHE = LRUCache(max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "128")), backing=_disk_cache("responses"))
+
+# Summaries of validated lectures under the same keys, so retries only redo the graph step
+SUMMARY_CACHE = LRUCache(max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "128")), backing=_disk_cache("summaries"))
+
+# Output token budget per agent, sized to typical output lengths rather than model maximums
+AGENT_MAX_TOKENS = {
+    "validation": int(os.getenv("VALIDATION_MAX_TOKENS", "500")),
+    "summarization": int(os.getenv("SUMMARY_MAX_TOKENS", "6000")),
+    "visualization": int(os.getenv("DOT_MAX_TOKENS", "6000")),
+}
+
+# Streamed DOT output is abandoned if no graph header has appeared within this many characters
+# (0 disables the check); reasoning models can write long preambles before the code
+DOT_HEADER_SEARCH_CHARS = int(os.getenv("DOT_HEADER_SEARCH_CHARS", "20000"))
+
+# Known model context window limits (output token limits)
+MODEL_OUTPUT_LIMITS = {
+    # Anthropic models
+    "claude-opus-4-1-20250805": 32000,       # 32k context window
+    "claude-opus-4-20250514": 32000,         # 32k context window
+    "claude-sonnet-4-20250514": 64000,       # 64k context window
+    "claude-3-7-sonnet-20250219": 64000,     # 64k context window
+    "claude-3-5-haiku-20241022": 8000,       # 8k context window
+    
+    # OpenAI models
+    "gpt-5": 128000,                         # 128k context window
+    "gpt-4.1": 32000,                        # 32k context window
+    "gpt-4o": 128000,                        # 128k context window
+    "gpt-4o-mini": 16000,                    # 16k context window
+    "gpt-4-turbo": 4000,                     # 4k context window
+    
+    # OpenRouter Anthropic models
+    "anthropic/claude-opus-4-1-20250805": 32000,     # 32k context window
+    "anthropic/claude-opus-4-20250514": 32000,       # 32k context window
+    "anthropic/claude-sonnet-4-20250514": 64000,     # 64k context window
+    "anthropic/claude-3-7-sonnet-20250219": 64000,   # 64k context window
+    "anthropic/claude-3-5-haiku-20241022": 8000,     # 8k context window
+    
+    # OpenRouter OpenAI models
+    "openai/gpt-5": 128000,                  # 128k context window
+    "openai/gpt-4.1": 32000,                 # 32k context window
+    "openai/gpt-4o": 128000,                 # 128k context window
+    "openai/gpt-4o-mini": 16000,             # 16k context window
+    "openai/gpt-4-turbo": 4000,              # 4k context window
+    
+    # OpenRouter free models (with real context windows)
+    "deepseek/deepseek-chat-v3-0324:free": 160000,  # DeepSeek R1: 160k
+    "deepseek/deepseek-r1-0528:free": 160000,       # DeepSeek R1: 160k
+    "qwen/qwen3-coder:free": 40000,                 # Qwen 3 4B: 40k
+    "deepseek/deepseek-r1:free": 160000,            # DeepSeek R1: 160k
+    "moonshotai/kimi-k2:free": 32000,               # Kimi 2: 32k
+    "qwen/qwen3-235b-a22b:free": 41000,             # Qwen3 235B A22B: 41k
+    "meta-llama/llama-3.3-70b-instruct:free": 130000, # Llama 3.3: 130k (using 3.2 data)
+    "google/gemma-3n-e4b-it:free": 2000,            # Gemma 3N4B: 2k
+    "mistralai/mistral-small-3.1-24b-instruct:free": 95000, # Mistral Small 3.1: 95k
+    "openai/gpt-oss-20b:free": 130000,              # GPT-OSS-20B: 130k
+    "google/gemma-3n-e2b-it:free": 2000,            # Gemma 3N2B: 2k
+    "meta-llama/llama-3.2-3b-instruct:free": 130000, # Llama 3.2 3B: 130k
+    "qwen/qwen3-4b:free": 40000,                    # Qwen 3 4B: 40k
+    "mistralai/mistral-7b-instruct:free": 95000,    # Using Mistral Small data: 95k
+    "google/gemma-2-9b-it:free": 8000,              # Gemma 2 9B: 8k
+    "google/gemma-3-27b-it:free": 8000,             # Using Gemma 2 data: 8k
+}
+
+# Agent type scaling factors (percentage of max tokens to use)
+AGENT_TOKEN_SCALING = {
+    "validation": 0.15,      # 15% - short responses for classification
+    "summarization": 0.75,   # 75% - detailed hierarchical summaries
+    "visualization": 0.70    # 70% - complex DOT code structures
+}
+
+# Minimum viable output budget per agent type
+AGENT_MIN_TOKENS = {
+    "validation": 500,
+    "summarization": 2000,
+    "visualization": 2000
+}
+
+# Fallback output limits for unknown models, keyed by a family name found in the model id;
+# families are listed in match priority so "gpt-4o-mini" wins over the generic "gpt"
+MODEL_FAMILY_LIMITS = {
+    "haiku": 8192,
+    "sonnet": 8000,
+    "opus": 8000,
+    "gpt-4o-mini": 16384,
+    "gpt": 4096,
+    "deepseek": 8000,
+    "qwen": 8000,
+    "llama": 8000,
+    "gemma": 8000,
+    "mistral": 8000,
+}
+_MODEL_FAMILY_RE = re.compile("|".join(map(re.escape, MODEL_FAMILY_LIMITS)), re.IGNORECASE)
+
+@lru_cache(maxsize=128)
 def get_model_max_tokens(model_name: str, agent_type: str) -> int:
     """
     Get dynamic max tokens based on model capabilities and agent type
@@ -27,153 +189,173 @@ def get_model_max_tokens(model_name: str, agent_type: str) -> int:
     Returns:
         int: Optimal max_tokens for the model and agent combination
     """
-    # Known model context window limits (output token limits)
-    model_limits = {
-        # Anthropic models
-        "claude-opus-4-1-20250805": 32000,       # 32k context window
-        "claude-opus-4-20250514": 32000,         # 32k context window
-        "claude-sonnet-4-20250514": 64000,       # 64k context window
-        "claude-3-7-sonnet-20250219": 64000,     # 64k context window
-        "claude-3-5-haiku-20241022": 8000,       # 8k context window
-        
-        # OpenAI models
-        "gpt-5": 128000,                         # 128k context window
-        "gpt-4.1": 32000,                        # 32k context window
-        "gpt-4o": 128000,                        # 128k context window
-        "gpt-4o-mini": 16000,                    # 16k context window
-        "gpt-4-turbo": 4000,                     # 4k context window
-        
-        # OpenRouter Anthropic models
-        "anthropic/claude-opus-4-1-20250805": 32000,     # 32k context window
-        "anthropic/claude-opus-4-20250514": 32000,       # 32k context window
-        "anthropic/claude-sonnet-4-20250514": 64000,     # 64k context window
-        "anthropic/claude-3-7-sonnet-20250219": 64000,   # 64k context window
-        "anthropic/claude-3-5-haiku-20241022": 8000,     # 8k context window
-        
-        # OpenRouter OpenAI models
-        "openai/gpt-5": 128000,                  # 128k context window
-        "openai/gpt-4.1": 32000,                 # 32k context window
-        "openai/gpt-4o": 128000,                 # 128k context window
-        "openai/gpt-4o-mini": 16000,             # 16k context window
-        "openai/gpt-4-turbo": 4000,              # 4k context window
-        
-        # OpenRouter free models (with real context windows)
-        "deepseek/deepseek-chat-v3-0324:free": 160000,  # DeepSeek R1: 160k
-        "deepseek/deepseek-r1-0528:free": 160000,       # DeepSeek R1: 160k
-        "qwen/qwen3-coder:free": 40000,                 # Qwen 3 4B: 40k
-        "deepseek/deepseek-r1:free": 160000,            # DeepSeek R1: 160k
-        "moonshotai/kimi-k2:free": 32000,               # Kimi 2: 32k
-        "qwen/qwen3-235b-a22b:free": 41000,             # Qwen3 235B A22B: 41k
-        "meta-llama/llama-3.3-70b-instruct:free": 130000, # Llama 3.3: 130k (using 3.2 data)
-        "google/gemma-3n-e4b-it:free": 2000,            # Gemma 3N4B: 2k
-        "mistralai/mistral-small-3.1-24b-instruct:free": 95000, # Mistral Small 3.1: 95k
-        "openai/gpt-oss-20b:free": 130000,              # GPT-OSS-20B: 130k
-        "google/gemma-3n-e2b-it:free": 2000,            # Gemma 3N2B: 2k
-        "meta-llama/llama-3.2-3b-instruct:free": 130000, # Llama 3.2 3B: 130k
-        "qwen/qwen3-4b:free": 40000,                    # Qwen 3 4B: 40k
-        "mistralai/mistral-7b-instruct:free": 95000,    # Using Mistral Small data: 95k
-        "google/gemma-2-9b-it:free": 8000,              # Gemma 2 9B: 8k
-        "google/gemma-3-27b-it:free": 8000,             # Using Gemma 2 data: 8k
-    }
-    
-    # Agent type scaling factors (percentage of max tokens to use)
-    scaling_factors = {
-        "validation": 0.15,      # 15% - short responses for classification
-        "summarization": 0.75,   # 75% - detailed hierarchical summaries
-        "visualization": 0.70    # 70% - complex DOT code structures
-    }
-    
     # Get base limit for the model
-    if model_name in model_limits:
-        base_limit = model_limits[model_name]
+    if model_name in MODEL_OUTPUT_LIMITS:
+        base_limit = MODEL_OUTPUT_LIMITS[model_name]
     else:
-        # Smart fallbacks based on model name patterns
-        model_lower = model_name.lower()
-        if "haiku" in model_lower:
-            base_limit = 8192
-        elif "sonnet" in model_lower:
-            base_limit = 8000
-        elif "opus" in model_lower:
-            base_limit = 8000
-        elif "gpt-4o-mini" in model_lower:
-            base_limit = 16384
-        elif "gpt" in model_lower:
-            base_limit = 4096
-        elif "deepseek" in model_lower or "qwen" in model_lower:
-            base_limit = 8000
-        elif "llama" in model_lower or "gemma" in model_lower:
-            base_limit = 8000
-        elif "mistral" in model_lower:
-            base_limit = 8000
-        else:
-            base_limit = 4000  # Conservative fallback for unknown models
+        # Smart fallback based on the model family in the name
+        family = _MODEL_FAMILY_RE.search(model_name)
+        base_limit = MODEL_FAMILY_LIMITS[family.group(0).lower()] if family else 4000  # Conservative fallback for unknown models
     
     # Apply scaling factor for agent type
-    scaled_limit = int(base_limit * scaling_factors.get(agent_type, 0.5))
+    scaled_limit = int(base_limit * AGENT_TOKEN_SCALING.get(agent_type, 0.5))
     
     # Ensure minimum viable limits
-    min_limits = {
-        "validation": 500,
-        "summarization": 2000,
-        "visualization": 2000
-    }
+    final_limit = max(scaled_limit, AGENT_MIN_TOKENS.get(agent_type, 1000))
     
-    final_limit = max(scaled_limit, min_limits.get(agent_type, 1000))
+    # Never reserve more than the per-agent budget; large reservations slow scheduling
+    if agent_type in AGENT_MAX_TOKENS:
+        final_limit = min(final_limit, AGENT_MAX_TOKENS[agent_type])
     
-    print(f"🎯 Model: {model_name}, Agent: {agent_type}, Base: {base_limit}, Scaled: {final_limit}")
+    logger.debug("🎯 Model: %s, Agent: %s, Base: %s, Scaled: %s", model_name, agent_type, base_limit, final_limit)
     
     return final_limit
 
-def get_llm_instance(model_name=None, temperature=0.1, max_tokens=4000, agent_type="general"):
+# Total context window (prompt + output tokens) by model family, checked locally before
+# sending a lecture; models not matched here are left to the provider to reject
+MODEL_CONTEXT_WINDOWS = {
+    "claude": 200000,
+    "gpt-4.1": 1047576,
+    "gpt-5": 400000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+}
+_CONTEXT_FAMILY_RE = re.compile("|".join(map(re.escape, MODEL_CONTEXT_WINDOWS)), re.IGNORECASE)
+
+def estimate_tokens(text: str) -> int:
     """
-    Create LLM instance based on environment configuration with dynamic token limits
-    Supports multiple providers: Anthropic, OpenAI, OpenRouter
+    Cheap lower-bound token estimate without a tokenizer: about 4 characters per token
+    for Latin text, at least one token per word or Chinese/Japanese character
     """
-    provider = os.getenv("PROVIDER", "anthropic").lower()
-    model = model_name or os.getenv("MODEL_NAME", "claude-3-5-haiku-20241022")
+    return max(len(text) // 4, sum(1 for _ in _WORD_RE.finditer(text)))
+
+def exceeds_context_window(model_name: str, prompt_tokens: int, agent_type: str) -> bool:
+    """
+    Check whether a prompt plus the agent's output budget cannot fit the model's context window
     
-    # Use dynamic max_tokens based on model capabilities and agent type
-    if agent_type != "general":
-        max_tokens = get_model_max_tokens(model, agent_type)
+    Args:
+        model_name (str): The model identifier
+        prompt_tokens (int): Estimated prompt size in tokens
+        agent_type (str): Type of agent, for its max_tokens budget
     
-    print(f"🤖 Creating LLM instance: provider={provider}, model={model}, max_tokens={max_tokens}, agent={agent_type}")
+    Returns:
+        bool: True if the request is certain to be rejected by the provider
+    """
+    family = _CONTEXT_FAMILY_RE.search(model_name)
+    if not family:
+        return False
+    context_window = MODEL_CONTEXT_WINDOWS[family.group(0).lower()]
+    return prompt_tokens + get_model_max_tokens(model_name, agent_type) > context_window
+
+# Environment variable holding the API key for each supported provider
+PROVIDER_API_KEY_ENV = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+}
+
+@lru_cache(maxsize=1)
+def _shared_async_http_client() -> httpx.AsyncClient:
+    """
+    Connection pool shared by every OpenAI-compatible client so keep-alive connections
+    (and their TLS sessions) are reused across agents and requests
+    """
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        # Idle sockets are kept for 30s (httpx defaults to 5s) so they survive gaps between requests
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30.0),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+    )
+
+def _create_llm(provider: str, model: str, temperature: float, max_tokens: int, api_key: str | None):
+    """
+    Construct an LLM client for a fully resolved configuration
+    Not memoized here, so raw API keys never become cache keys; agents are cached per
+    configuration in AGENT_CACHE, which keeps the clients and their connection pools alive
+    SDK retries are disabled; retry_async in _invoke_agent / _stream_agent is the only retry layer
+    """
+    logger.debug("🤖 Creating LLM instance: provider=%s, model=%s, max_tokens=%s", provider, model, max_tokens)
     
+    # Provider SDKs are imported on first use so a worker only loads the one it needs
     if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
         return ChatAnthropic(
             model=model,
             temperature=temperature,
-            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            api_key=api_key,
             max_tokens=max_tokens,
+            max_retries=0,
         )
     elif provider == "openai":
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             model=model,
             temperature=temperature,
-            api_key=os.getenv("OPENAI_API_KEY"),
+            api_key=api_key,
             max_tokens=max_tokens,
+            max_retries=0,
+            http_async_client=_shared_async_http_client(),
         )
     elif provider == "openrouter":
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             model=model,
             temperature=temperature,
-            api_key=os.getenv("OPENROUTER_API_KEY"),
+            api_key=api_key,
             base_url="https://openrouter.ai/api/v1",
             max_tokens=max_tokens,
+            max_retries=0,
+            http_async_client=_shared_async_http_client(),
         )
     else:
         raise ValueError(f"Unsupported provider: {provider}")
 
-def create_summarization_agent():
-    """Create and configure the LLM instance specialized for summarization"""
-    return get_llm_instance(agent_type="summarization")
+def get_llm_instance(model_name=None, temperature=0.1, max_tokens=4000, agent_type="general", provider=None, api_key=None):
+    """
+    Create LLM instance with dynamic token limits; provider, model and API key default to
+    the environment configuration
+    Supports multiple providers: Anthropic, OpenAI, OpenRouter
+    """
+    provider = (provider or os.getenv("PROVIDER", "anthropic")).lower()
+    model = model_name or os.getenv("MODEL_NAME", "claude-3-5-haiku-20241022")
+    
+    if provider not in PROVIDER_API_KEY_ENV:
+        raise ValueError(f"Unsupported provider: {provider}")
+    
+    # Use dynamic max_tokens based on model capabilities and agent type
+    if agent_type != "general":
+        max_tokens = get_model_max_tokens(model, agent_type)
+    
+    if api_key is None:
+        api_key = os.getenv(PROVIDER_API_KEY_ENV[provider])
+    return _create_llm(provider, model, temperature, max_tokens, api_key)
 
-def create_visualization_agent():
-    """Create and configure the LLM instance specialized for DOT code generation"""
-    return get_llm_instance(agent_type="visualization")
+# Cheapest model per provider for the one-word validation answer. OpenRouter keeps the
+# selected model since its free tier has no guaranteed small model.
+VALIDATION_MODEL_DEFAULTS = {
+    "anthropic": "claude-3-5-haiku-20241022",
+    "openai": "gpt-4o-mini",
+}
 
-def create_validation_agent():
-    """Create and configure the LLM instance specialized for content validation"""
-    return get_llm_instance(agent_type="validation")
+# Per-agent model overrides are deployment settings, read once at import. PROVIDER, MODEL_NAME
+# and the API keys are only defaults; the web app passes its configuration with each call.
+SUMMARIZATION_MODEL = os.getenv("SUMMARIZATION_MODEL")
+VISUALIZATION_MODEL = os.getenv("VISUALIZATION_MODEL")
+VALIDATION_MODEL = os.getenv("VALIDATION_MODEL")
+
+def create_summarization_agent(provider=None, model=None, api_key=None):
+    """Create and configure the LLM instance specialized for summarization (SUMMARIZATION_MODEL overrides the model)"""
+    return get_llm_instance(model_name=SUMMARIZATION_MODEL or model, agent_type="summarization", provider=provider, api_key=api_key)
+
+def create_visualization_agent(provider=None, model=None, api_key=None):
+    """Create and configure the LLM instance specialized for DOT code generation (VISUALIZATION_MODEL overrides the model)"""
+    return get_llm_instance(model_name=VISUALIZATION_MODEL or model, agent_type="visualization", provider=provider, api_key=api_key)
+
+def create_validation_agent(provider=None, model=None, api_key=None):
+    """Create and configure the LLM instance specialized for content validation (VALIDATION_MODEL overrides the model)"""
+    provider = (provider or os.getenv("PROVIDER", "anthropic")).lower()
+    model = VALIDATION_MODEL or VALIDATION_MODEL_DEFAULTS.get(provider) or model
+    return get_llm_instance(model_name=model, agent_type="validation", provider=provider, api_key=api_key)
 
 def get_agent_info():
     """
@@ -186,7 +368,7 @@ def get_agent_info():
         "validation_agent": {
             "purpose": "Content type classification and input filtering",
             "temperature": 0.1,
-            "max_tokens": 1000,
+            "max_tokens": AGENT_MAX_TOKENS["validation"],
             "optimization": "Fast and reliable content validation",
             "provider": "Anthropic",
             "model": "claude-3-5-haiku-20241022"
@@ -194,7 +376,7 @@ def get_agent_info():
         "summarization_agent": {
             "purpose": "Content analysis and structured summarization",
             "temperature": 0.1,
-            "max_tokens": 8000,
+            "max_tokens": AGENT_MAX_TOKENS["summarization"],
             "optimization": "Consistent, hierarchical output",
             "provider": "Anthropic",
             "model": "claude-3-5-haiku-20241022"
@@ -202,19 +384,15 @@ def get_agent_info():
         "visualization_agent": {
             "purpose": "DOT code generation and graph syntax",
             "temperature": 0.1,
-            "max_tokens": 8000,
+            "max_tokens": AGENT_MAX_TOKENS["visualization"],
             "optimization": "Precise syntax, complex structures",
             "provider": "Anthropic", 
             "model": "claude-3-5-haiku-20241022"
         }
     }
 
-def create_prompts():
-    """Create prompt templates for validation, summarization and DOT generation"""
-    
-    validation_prompt = ChatPromptTemplate.from_template("""You are a content validation specialist. Your job is to determine if the provided text contains educational or lecture-style content suitable for knowledge graph creation.
-
-VALID CONTENT TYPES:
+# Shared description of which inputs are suitable for knowledge graph creation
+CONTENT_TYPE_CRITERIA = """VALID CONTENT TYPES:
 - Academic lectures or presentations
 - Educational materials and explanations
 - Technical documentation and tutorials
@@ -233,17 +411,24 @@ INVALID CONTENT TYPES:
 - Very short text (less than 100 words)
 - Marketing or promotional content
 
-Your job is to classify the content type, NOT evaluate its structure or organization.
+Your job is to classify the content type, NOT evaluate its structure or organization."""
 
-Respond with EXACTLY one word: either "VALID" or "INVALID"
+# The language requirement is stated once at the top of each prompt and repeated once at
+# the end (closest to the input); intermediate restatements only cost input tokens.
+# Each prompt is split into static instructions (sent first, identical on every call so
+# providers can reuse the cached prefix) and a short dynamic input message sent last
+VALIDATION_INSTRUCTIONS = """You are a content validation specialist. Your job is to determine if the provided text contains educational or lecture-style content suitable for knowledge graph creation.
 
-Content to validate: {input_text}""")
-    
-    summarizer_prompt = ChatPromptTemplate.from_template("""CRITICAL LANGUAGE REQUIREMENT: You MUST write your entire summary in the EXACT SAME LANGUAGE as the input lecture content. If the lecture is in Arabic, write EVERYTHING in Arabic. If in English, write EVERYTHING in English. Do NOT mix languages or translate anything.
+""" + CONTENT_TYPE_CRITERIA + """
 
-I want you to generate a detailed, hierarchical summary of a topic I provide, using the exact format described below. Your output should follow these formatting and content guidelines:
+Respond with EXACTLY one word: either "VALID" or "INVALID\""""
 
-LANGUAGE RULE: Match the input language exactly - Arabic content gets Arabic summary, English content gets English summary, etc.
+# Per-request input follows a fixed prefix; plain concatenation, no template formatting
+VALIDATION_INPUT_PREFIX = "Content to validate: "
+
+SUMMARIZER_INSTRUCTIONS = """CRITICAL LANGUAGE REQUIREMENT: You MUST write your entire summary in the EXACT SAME LANGUAGE as the input lecture content. If the lecture is in Arabic, write EVERYTHING in Arabic. If in English, write EVERYTHING in English. Do NOT mix languages or translate anything.
+
+I want you to generate a detailed, hierarchical summary of a topic I provide, using the exact format described below. Your output should follow these formatting and content guidelines:
 
 Use a hierarchical structure
 Begin with the main topic, then move to subtopics, and then to sub-subtopics as needed. Each level should be clearly indented using this pattern:
@@ -292,13 +477,25 @@ Machine Learning (ML):
 ----- Example: Predicting house prices from area and number of rooms
 ----- Simple, fast, and interpretable
 
-REMEMBER: Write your summary in the SAME LANGUAGE as the lecture content below.
+REMEMBER: Write your summary in the SAME LANGUAGE as the lecture content.
+
+Return ONLY the hierarchical summary in the same language as the input, without any explanations or additional text."""
+
+SUMMARIZER_INPUT_PREFIX = "Lecture content: "
+
+# Validation and summarization fused into one call: the model emits a VALID/INVALID
+# tag first, so rejected input costs a single short response instead of two round trips
+VALIDATE_AND_SUMMARIZE_INSTRUCTIONS = """Before summarizing, decide whether the lecture content is educational or lecture-style content suitable for knowledge graph creation.
 
-Lecture content: {lecture}
+""" + CONTENT_TYPE_CRITERIA + """
 
-Return ONLY the hierarchical summary in the same language as the input, without any explanations or additional text.""")
+If the content is INVALID, respond with EXACTLY the word "INVALID" and nothing else.
+If the content is VALID, respond with the word "VALID" on its own first line, followed by the hierarchical summary described below.
 
-    dot_prompt = ChatPromptTemplate.from_template("""CRITICAL LANGUAGE REQUIREMENT: You MUST write ALL node labels in the EXACT SAME LANGUAGE as the input summary. If the summary is in Arabic, ALL labels must be in Arabic. If in English, ALL labels must be in English. Do NOT translate or mix languages.
+""" + SUMMARIZER_INSTRUCTIONS + """
+The first line of your response must be either "VALID" or "INVALID"."""
+
+DOT_INSTRUCTIONS = """CRITICAL LANGUAGE REQUIREMENT: You MUST write ALL node labels in the EXACT SAME LANGUAGE as the input summary. If the summary is in Arabic, ALL labels must be in Arabic. If in English, ALL labels must be in English. Do NOT translate or mix languages.
 
 I want you to generate a Graphviz DOT file that visually represents a hierarchical summary of a topic. The input is a structured summary written in the following indentation style:
 
@@ -309,8 +506,6 @@ Main Topic:
 
 Your output should follow these formatting and structural guidelines:
 
-LANGUAGE RULE: All node labels must match the language of the input summary exactly.
-
 Use the DOT language syntax
 Output valid Graphviz DOT code that can be rendered using tools like dot, xdot, or online Graphviz editors.
 
@@ -330,7 +525,6 @@ CRITICAL COLOR GUIDELINES:
 - Always specify explicit fontcolor for text visibility
 - ONLY use light colors for good text readability: white, yellow, cyan, pink, orange
 - AVOID dark colors like blue, green, red, purple as they make text hard to read
-- For text color: use fontcolor=black for light backgrounds, fontcolor=white for dark backgrounds
 - Never use black for the background of a node
 
 
@@ -369,119 +563,802 @@ Goal:
 Produce a clean, valid DOT file with proper syntax that accurately reflects the logical structure of the input summary, with nodes visually grouped by color based on their parent relationships.
 REMEMBER: Write ALL node labels in the SAME LANGUAGE as the input summary.
 
-Hierarchical summary: {summary}
+Return ONLY the DOT code without any explanations, additional text, or any ` used for annotating code, so don't put the code inside markdown syntax."""
+
+DOT_INPUT_PREFIX = "Hierarchical summary: "
+
+@lru_cache(maxsize=16)
+def _system_message(instructions: str, cache_static_prefix: bool) -> SystemMessage:
+    """
+    Build the static system message for a set of instructions (built once)
+    
+    Args:
+        instructions (str): Static instruction text, with literal braces escaped as {{ }}
+        cache_static_prefix (bool): Mark the instructions with Anthropic's ephemeral cache_control
+    
+    Returns:
+        SystemMessage: The shared system message
+    """
+    text = instructions.format()
+    if cache_static_prefix:
+        return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+    return SystemMessage(content=text)
+
+def build_validation_messages(input_text: str, cache_static_prefix: bool = False) -> list:
+    """Messages for the validation agent: static instructions first, content last"""
+    return [
+        _system_message(VALIDATION_INSTRUCTIONS, cache_static_prefix),
+        HumanMessage(content=VALIDATION_INPUT_PREFIX + input_text),
+    ]
+
+def build_summarization_messages(lecture: str, cache_static_prefix: bool = False) -> list:
+    """Messages for the summarization agent: static instructions first, lecture last"""
+    return [
+        _system_message(SUMMARIZER_INSTRUCTIONS, cache_static_prefix),
+        HumanMessage(content=SUMMARIZER_INPUT_PREFIX + lecture),
+    ]
+
+def build_validate_and_summarize_messages(lecture: str, cache_static_prefix: bool = False) -> list:
+    """Messages for the fused validation + summarization call"""
+    return [
+        _system_message(VALIDATE_AND_SUMMARIZE_INSTRUCTIONS, cache_static_prefix),
+        HumanMessage(content=SUMMARIZER_INPUT_PREFIX + lecture),
+    ]
 
-Return ONLY the DOT code without any explanations, additional text, or any ` used for annotating code, so don't put the code inside markdown syntax.""")
+def build_dot_messages(summary: str, cache_static_prefix: bool = False) -> list:
+    """Messages for the visualization agent: static instructions first, summary last"""
+    return [
+        _system_message(DOT_INSTRUCTIONS, cache_static_prefix),
+        HumanMessage(content=DOT_INPUT_PREFIX + summary),
+    ]
+
+def _resolve_config(provider: str = None, model: str = None, api_key: str = None) -> tuple[str, str, str | None]:
+    """
+    Resolve the provider configuration for a call; anything not given explicitly
+    is read from the environment
     
-    return validation_prompt, summarizer_prompt, dot_prompt
+    Returns:
+        tuple: (provider, model, api_key)
+    """
+    provider = (provider or os.getenv("PROVIDER", "anthropic")).lower()
+    model = model or os.getenv("MODEL_NAME", "claude-3-5-haiku-20241022")
+    if api_key is None:
+        api_key_env = PROVIDER_API_KEY_ENV.get(provider)
+        api_key = os.getenv(api_key_env) if api_key_env else None
+    return provider, model, api_key
 
-def pipeline(input_text: str, progress_callback=None):
+# Agents per configuration, keyed by a hash so raw API keys are never used as cache keys
+AGENT_CACHE = LRUCache(max_entries=32)
+
+def _get_agents(provider: str, model: str, api_key: str | None):
     """
-    Multi-agent pipeline function that processes lecture text into knowledge graph
-    Uses specialized agents for different tasks:
-    - Validation Agent: Content type classification and input filtering
-    - Summarization Agent: Optimized for content analysis and structured summarization
-    - Visualization Agent: Optimized for DOT code generation and graph syntax
+    Get the agents for a configuration (built once and cached)
+    
+    Returns:
+        tuple: (validation_agent, summarization_agent, visualization_agent)
+    """
+    cache_key = make_cache_key(provider, model, api_key or "")
+    agents = AGENT_CACHE.get(cache_key)
+    if agents is None:
+        agents = (
+            create_validation_agent(provider, model, api_key),
+            create_summarization_agent(provider, model, api_key),
+            create_visualization_agent(provider, model, api_key),
+        )
+        AGENT_CACHE.set(cache_key, agents)
+    return agents
+
+def reset_agents():
+    """
+    Drop every cached agent so the next call rebuilds them
+    (after a fork, or for tests that change provider settings in-process)
+    """
+    AGENT_CACHE.clear()
+
+def _evict_agents(provider: str, model: str, api_key: str | None):
+    """Drop the cached agents of a single configuration, e.g. after its API key was rejected"""
+    AGENT_CACHE.discard(make_cache_key(provider, model, api_key or ""))
+
+def clear_caches():
+    """Drop every cached summary and pipeline result, including entries on disk"""
+    RESPONSE_CACHE.clear()
+    SUMMARY_CACHE.clear()
+
+@lru_cache(maxsize=1)
+def _prompt_fingerprint() -> str:
+    """Hash of the prompt text so cached responses are invalidated when prompts change"""
+    return make_cache_key(
+        VALIDATION_INSTRUCTIONS, VALIDATION_INPUT_PREFIX,
+        SUMMARIZER_INSTRUCTIONS, SUMMARIZER_INPUT_PREFIX,
+        VALIDATE_AND_SUMMARIZE_INSTRUCTIONS,
+        DOT_INSTRUCTIONS, DOT_INPUT_PREFIX,
+    )
+
+# Markdown and punctuation a model may wrap the VALID/INVALID tag in ("**VALID**", "VALID.")
+_VALIDATION_TAG_DECORATION = " \t*_`#>.:!\"'"
+
+def _split_validation_tag(response: str) -> tuple[bool, str]:
+    """
+    Split the fused validation + summarization response into its verdict and summary
+    
+    Args:
+        response (str): Raw model output starting with a VALID/INVALID line
+    
+    Returns:
+        tuple[bool, str]: (is_valid, summary); an untagged response is treated as a valid summary
+    """
+    first_line, _, remainder = response.strip().partition("\n")
+    # Only a whole-line tag counts, so headings like "Cache Invalidation:" stay part of the summary
+    verdict = first_line.strip(_VALIDATION_TAG_DECORATION).upper()
+    if verdict == "INVALID":
+        return False, ""
+    if verdict == "VALID":
+        return True, remainder.strip()
+    return True, response.strip()
+
+def precheck_content(input_text: str) -> bool | None:
+    """
+    Classify obvious cases locally so they never reach the validation agent
+    
+    Args:
+        input_text (str): The content to check
+    
+    Returns:
+        bool | None: False for clearly invalid input, True for clearly educational input,
+        None when the validation agent has to decide
+    """
+    if len(_WORD_RE.findall(input_text)) < MIN_CONTENT_WORDS:
+        return False
+    
+    # Binary files pasted or uploaded as text
+    if len(_CONTROL_CHARS_RE.findall(input_text)) > len(input_text) // 100:
+        return False
+    
+    # Diary entries and timestamped chat logs look just like lecture transcripts
+    # ("00:01 Professor: ..."), so they are left to the validation agent
+    if len(_NON_EDUCATIONAL_MARKERS_RE.findall(input_text)) >= 3:
+        return None
+    
+    # Several distinct educational markers are a confident accept
+    markers = {marker.lower() for marker in _EDUCATIONAL_MARKERS_RE.findall(input_text)}
+    if len(markers) >= 3:
+        return True
+    
+    return None
+
+@cache
+def _summary_instruction_tokens() -> int:
+    return estimate_tokens(VALIDATE_AND_SUMMARIZE_INSTRUCTIONS)
+
+def _summary_exceeds_context(input_text: str, model: str) -> bool:
+    """Check locally whether a lecture is too long for the summarization model"""
+    model = SUMMARIZATION_MODEL or model
+    return exceeds_context_window(model, _summary_instruction_tokens() + estimate_tokens(input_text), "summarization")
+
+def _finalize_dot_code(summary: str, dot_code_raw: str) -> tuple:
+    """
+    Clean the visualization agent output and check it is usable DOT code
+    
+    Args:
+        summary (str): The hierarchical summary the graph was generated from
+        dot_code_raw (str): Raw output from the visualization agent
+    
+    Returns:
+        tuple: (summary, dot_code) or (error_message, None) on failure
+    """
+    logger.debug("🧹 Cleaning DOT code...")
+    dot_code = clean_dot_code(dot_code_raw)
+    logger.debug("📝 Cleaned DOT code (length: %d chars)", len(dot_code))
+    
+    if not dot_code or dot_code.isspace():
+        error_msg = "Unable to generate graph code from the content. Please try with different text or a different AI model."
+        logger.warning("❌ No valid DOT code generated by visualization agent")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📝 Raw output from agent:\n%s\n%s\n%s", "-" * 50, dot_code_raw, "-" * 50)
+        return error_msg, None
+    
+    # Basic DOT structure validation
+    if not _DOT_KEYWORD_RE.search(dot_code):
+        error_msg = "Generated graph code is malformed. Please try again with different content or model."
+        logger.warning("❌ Generated code does not contain 'digraph' or 'graph' keyword")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📝 Generated code:\n%s\n%s\n%s", "-" * 50, dot_code, "-" * 50)
+        return error_msg, None
+    
+    logger.debug("✅ DOT code generation completed successfully")
+    return summary, dot_code
+
+def _pipeline_error(error: Exception, provider: str = None, model: str = None, api_key: str = None) -> str:
+    """
+    Log a pipeline failure and map it to a user-friendly error message
+    
+    Args:
+        error (Exception): The exception raised while processing
+        provider (str): Provider of the failing call, if known
+        model (str): Model of the failing call, if known
+        api_key (str): API key of the failing call, if known
+    
+    Returns:
+        str: Message suitable for showing to the user
+    """
+    # Log detailed error for debugging
+    logger.error("Pipeline error: %s", error)
+    
+    # Provide user-friendly error message
+    user_friendly_error = "An error occurred while processing your content. Please try again."
+    
+    # Handle specific common errors
+    error_str = str(error).lower()
+    if "rate limit" in error_str or "quota" in error_str:
+        user_friendly_error = "API rate limit reached. Please wait a moment and try again."
+    elif "api key" in error_str or "authentication" in error_str:
+        user_friendly_error = "Authentication failed. Please check your API key."
+        # Don't keep clients around for a key the provider rejected; other configurations keep theirs
+        if provider is not None:
+            _evict_agents(provider, model, api_key)
+    elif "timeout" in error_str:
+        user_friendly_error = "Request timed out. Please try with shorter content."
+    elif "max_tokens" in error_str:
+        user_friendly_error = CONTENT_TOO_LONG_ERROR
+    
+    return user_friendly_error
+
+def _message_text(message) -> str:
+    """Get the text of a (possibly streamed) message whose content may be a list of blocks"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+def _concurrency_slot(agent):
+    """Semaphore limiting requests in flight to the agent's model, or a no-op context when unlimited"""
+    if LLM_MAX_CONCURRENCY <= 0:
+        return contextlib.nullcontext()
+    key = (type(agent).__name__, getattr(agent, "model_name", None) or getattr(agent, "model", None))
+    semaphores = _model_semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(key)
+    if semaphore is None:
+        semaphore = semaphores[key] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+async def _invoke_agent(agent, messages: list, rate_limiter: AsyncRateLimiter = None, semaphore: asyncio.Semaphore = None):
+    """
+    Invoke an agent under LLM_RATE_LIMITER, retrying transient provider errors; an extra
+    rate_limiter and semaphore (e.g. a batch's own limits) apply on top of the process-wide ones
+    """
+    async def attempt():
+        await LLM_RATE_LIMITER.acquire()
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+        # Slots are released between attempts so backoff waits don't hold them
+        async with semaphore or contextlib.nullcontext(), _concurrency_slot(agent):
+            return await agent.ainvoke(messages)
+    
+    return await retry_async(attempt, attempts=LLM_MAX_ATTEMPTS)
+
+async def _stream_agent(agent, messages: list, on_chunk=None):
+    """
+    Stream an agent response under the rate limiter, retrying transient provider errors
+    
+    Args:
+        agent: The LLM to stream from
+        messages (list): Prompt messages
+        on_chunk (callable): Optional callback receiving (chunk, message_so_far) per chunk;
+            returning True stops the stream early
+    
+    Returns:
+        The merged response message, or None if nothing was streamed
+    """
+    async def attempt():
+        await LLM_RATE_LIMITER.acquire()
+        message = None
+        # aclosing closes the stream on an early stop, so the provider connection is released
+        async with _concurrency_slot(agent), contextlib.aclosing(agent.astream(messages)) as stream:
+            async for chunk in stream:
+                message = chunk if message is None else message + chunk
+                if on_chunk and on_chunk(chunk, message):
+                    break
+        return message
+    
+    return await retry_async(attempt, attempts=LLM_MAX_ATTEMPTS)
+
+def _settings_fingerprint() -> str:
+    """Deployment settings that change pipeline output, so results made under other settings are not reused"""
+    return "|".join(map(str, (SUMMARIZATION_MODEL, VISUALIZATION_MODEL, VALIDATION_MODEL, FUSE_VALIDATION, DOT_FROM_SUMMARY)))
+
+def _response_cache_key(input_text: str, provider: str, model: str) -> str:
+    """Cache key for a pipeline result under a provider/model configuration"""
+    return make_cache_key(provider, model, _prompt_fingerprint(), _settings_fingerprint(), normalize_text(input_text))
+
+async def summarize_async(input_text: str, progress_callback=None, *, provider: str = None, model: str = None, api_key: str = None):
+    """
+    Validate the lecture and produce its hierarchical summary (pipeline steps 1 and 2)
+    Summaries are cached so a pipeline retry after a failed graph step skips these calls
     
     Args:
         input_text (str): The content to process
         progress_callback (callable): Optional callback function for progress updates
+        provider (str): AI provider to use (default: PROVIDER environment variable)
+        model (str): Model name to use (default: MODEL_NAME environment variable)
+        api_key (str): API key for the provider (default: the provider's API key environment variable)
     
     Returns:
-        tuple: (summary, dot_code) or (error_message, None) on failure
+        tuple: (True, summary) or (False, error_message) on failure
     """
     try:
-        # Create specialized agents using environment variable
-        validation_agent = create_validation_agent()
-        summarization_agent = create_summarization_agent()
-        visualization_agent = create_visualization_agent()
+        provider, model, api_key = _resolve_config(provider, model, api_key)
+        cache_key = _response_cache_key(input_text, provider, model)
+        summary = SUMMARY_CACHE.get(cache_key)
+        if summary is not None:
+            logger.debug("⚡ Reusing cached summary")
+            return True, summary
         
-        # Get prompts
-        validation_prompt, summarizer_prompt, dot_prompt = create_prompts()
+        # Reject (or accept) obvious cases without an LLM round trip
+        local_verdict = precheck_content(input_text)
+        if local_verdict is False:
+            logger.info("❌ Content validation failed locally")
+            return False, INVALID_CONTENT_ERROR
         
-        # Create specialized chains
-        validation_chain = validation_prompt | validation_agent
-        summarizer_chain = summarizer_prompt | summarization_agent
-        dot_chain = dot_prompt | visualization_agent
+        # The provider would reject an oversized prompt only after a full round trip
+        if _summary_exceeds_context(input_text, model):
+            logger.info("❌ Content exceeds the summarization model's context window")
+            return False, CONTENT_TOO_LONG_ERROR
         
-        # Step 1: Validation Agent checks content type
-        if progress_callback:
-            progress_callback("validating", "🔍 Validation agent checking content type...")
+        # Get specialized agents (built once per configuration)
+        validation_agent, summarization_agent, _ = _get_agents(provider, model, api_key)
         
-        validation_result = validation_chain.invoke({"input_text": input_text}).content.strip().upper()
+        # Anthropic only caches prompt prefixes that are explicitly marked; OpenAI-compatible
+        # providers cache long identical prefixes automatically and reject the extra field
+        cache_static_prefix = provider == "anthropic"
         
-        # Check if content is valid for processing
-        if "INVALID" in validation_result:
-            error_msg = "The provided content doesn't appear to be educational material suitable for creating knowledge graphs. Please provide lecture notes, tutorials, or informational content with learning concepts."
-            print(f"❌ Content validation failed: {validation_result}")
-            return error_msg, None
+        if FUSE_VALIDATION:
+            # Steps 1+2: Summarization Agent validates and summarizes in one call
+            if progress_callback:
+                progress_callback("analyzing", "🔍 Summarization agent checking and analyzing content...")
+            
+            head = ""
+            received_chars = 0
+            
+            def on_summary_chunk(chunk, message):
+                nonlocal head, received_chars
+                if message is chunk:
+                    # First chunk of a (possibly retried) stream
+                    head = ""
+                    received_chars = 0
+                chunk_text = _message_text(chunk)
+                received_chars += len(chunk_text)
+                # The verdict is the first line; stop paying for a summary of rejected content
+                if head is not None:
+                    head += chunk_text
+                    if "\n" in head.lstrip():
+                        if not _split_validation_tag(head)[0]:
+                            return True
+                        head = None
+                # Report progress once per completed line of the summary
+                if progress_callback and "\n" in chunk_text:
+                    progress_callback("analyzing", f"📝 Summarization agent writing summary... ({received_chars} chars)")
+                return False
+            
+            message = await _stream_agent(summarization_agent, build_validate_and_summarize_messages(input_text, cache_static_prefix), on_summary_chunk)
+            response = _message_text(message) if message is not None else ""
+            is_valid, summary = _split_validation_tag(response)
+            
+            if not is_valid:
+                logger.info("❌ Content validation failed: INVALID")
+                return False, INVALID_CONTENT_ERROR
+        else:
+            # Step 2 starts right away; most inputs are valid, so the summary is
+            # generated while the validation agent is still deciding
+            summary_task = asyncio.create_task(
+                _invoke_agent(summarization_agent, build_summarization_messages(input_text, cache_static_prefix))
+            )
+            
+            try:
+                # Step 1: Validation Agent checks content type, unless the local check already accepted it
+                if local_verdict is None:
+                    if progress_callback:
+                        progress_callback("validating", "🔍 Validation agent checking content type...")
+                    
+                    validation_result = _message_text(await _invoke_agent(validation_agent, build_validation_messages(input_text, cache_static_prefix))).strip().upper()
+                    
+                    # Check if content is valid for processing
+                    if "INVALID" in validation_result:
+                        logger.info("❌ Content validation failed: %s", validation_result)
+                        summary_task.cancel()
+                        return False, INVALID_CONTENT_ERROR
+            except BaseException:
+                summary_task.cancel()
+                raise
+            
+            # Step 2: Summarization Agent processes the lecture
+            if progress_callback:
+                progress_callback("analyzing", "📝 Summarization agent analyzing content...")
+            
+            summary = _message_text(await summary_task)
         
-        # Step 2: Summarization Agent processes the lecture
-        if progress_callback:
-            progress_callback("analyzing", "� Summarization agent analyzing content...")
+        if not summary or summary.isspace():
+            logger.warning("❌ Summarization agent returned an empty summary")
+            return False, EMPTY_SUMMARY_ERROR
+        
+        SUMMARY_CACHE.set(cache_key, summary)
+        return True, summary
+        
+    except Exception as e:
+        return False, _pipeline_error(e, provider, model, api_key)
+
+async def generate_graph_async(summary: str, progress_callback=None, *, provider: str = None, model: str = None, api_key: str = None):
+    """
+    Generate DOT code for an existing summary (pipeline step 3)
+    Can be called on its own to retry only the graph step
+    
+    Args:
+        summary (str): Hierarchical summary of the lecture
+        progress_callback (callable): Optional callback function for progress updates
+        provider (str): AI provider to use (default: PROVIDER environment variable)
+        model (str): Model name to use (default: MODEL_NAME environment variable)
+        api_key (str): API key for the provider (default: the provider's API key environment variable)
+    
+    Returns:
+        tuple: (summary, dot_code) or (error_message, None) on failure
+    """
+    try:
+        # Nothing to draw; don't spend a visualization call finding that out
+        if not summary or summary.isspace():
+            logger.warning("❌ Empty summary, skipping graph generation")
+            return EMPTY_SUMMARY_ERROR, None
         
-        summary = summarizer_chain.invoke({"lecture": input_text}).content
+        if DOT_FROM_SUMMARY:
+            dot_code_raw = summary_to_dot(summary)
+            if dot_code_raw:
+                logger.debug("📝 DOT code built from summary (length: %d chars)", len(dot_code_raw))
+                return _finalize_dot_code(summary, dot_code_raw)
+        
+        provider, model, api_key = _resolve_config(provider, model, api_key)
+        _, _, visualization_agent = _get_agents(provider, model, api_key)
+        cache_static_prefix = provider == "anthropic"
         
         # Step 3: Visualization Agent generates DOT code
         if progress_callback:
             progress_callback("generating", "🎨 Visualization agent creating graph...")
         
-        print("🤖 Requesting DOT code from visualization agent...")
-        dot_code_raw = dot_chain.invoke({"summary": summary}).content
-        print(f"📝 Raw DOT code received (length: {len(dot_code_raw)} chars)")
+        logger.debug("🤖 Streaming DOT code from visualization agent...")
         
-        print("🧹 Cleaning DOT code...")
-        dot_code = clean_dot_code(dot_code_raw)
-        print(f"📝 Cleaned DOT code (length: {len(dot_code)} chars)")
+        dot_cleaner = DotStreamCleaner()
+        received_chars = 0
         
-        if not dot_code.strip():
-            error_msg = "Unable to generate graph code from the content. Please try with different text or a different AI model."
-            print(f"❌ No valid DOT code generated by visualization agent")
-            print(f"📝 Raw output from agent:\n{'-'*50}")
-            print(dot_code_raw)
-            print(f"{'-'*50}")
-            return error_msg, None
+        def on_dot_chunk(chunk, message):
+            nonlocal dot_cleaner, received_chars
+            if message is chunk:
+                # First chunk of a (possibly retried) stream starts a fresh extraction
+                dot_cleaner = DotStreamCleaner()
+                received_chars = 0
+            chunk_text = _message_text(chunk)
+            received_chars += len(chunk_text)
+            dot_cleaner.feed(chunk_text)
+            # A response that is still prose this far in will not yield a graph; stop paying for it
+            if DOT_HEADER_SEARCH_CHARS and not dot_cleaner.text and received_chars > DOT_HEADER_SEARCH_CHARS:
+                logger.warning("❌ No graph header in the first %d chars of DOT output, stopping generation", received_chars)
+                return True
+            # Report progress once per completed line of DOT code
+            if progress_callback and "\n" in chunk_text:
+                progress_callback("generating", f"🎨 Visualization agent creating graph... ({len(dot_cleaner.text)} chars)")
+            # Stop generating as soon as the graph is closed; anything after it is discarded anyway
+            return dot_cleaner.complete
         
-        # Basic DOT structure validation
-        if not any(keyword in dot_code.lower() for keyword in ['digraph', 'graph']):
-            error_msg = "Generated graph code is malformed. Please try again with different content or model."
-            print(f"❌ Generated code does not contain 'digraph' or 'graph' keyword")
-            print(f"📝 Generated code:\n{'-'*50}")
-            print(dot_code)
-            print(f"{'-'*50}")
-            return error_msg, None
+        dot_message = await _stream_agent(visualization_agent, build_dot_messages(summary, cache_static_prefix), on_dot_chunk)
+        if dot_cleaner.complete:
+            dot_code_raw = dot_cleaner.text
+        else:
+            dot_code_raw = _message_text(dot_message) if dot_message is not None else ""
+        logger.debug("📝 Raw DOT code received (length: %d chars)", len(dot_code_raw))
         
-        print("✅ DOT code generation completed successfully")
-        return summary, dot_code
+        return _finalize_dot_code(summary, dot_code_raw)
         
     except Exception as e:
-        # Log detailed error for debugging
-        detailed_error = f"Pipeline error: {e}"
-        print(detailed_error)
-        
-        # Provide user-friendly error message
-        user_friendly_error = "An error occurred while processing your content. Please try again."
-        
-        # Handle specific common errors
-        error_str = str(e).lower()
-        if "rate limit" in error_str or "quota" in error_str:
-            user_friendly_error = "API rate limit reached. Please wait a moment and try again."
-        elif "api key" in error_str or "authentication" in error_str:
-            user_friendly_error = "Authentication failed. Please check your API key."
-        elif "timeout" in error_str:
-            user_friendly_error = "Request timed out. Please try with shorter content."
-        elif "max_tokens" in error_str:
-            user_friendly_error = "Content is too long for the selected model. Please try shorter text."
-        
-        return user_friendly_error, None
+        return _pipeline_error(e, provider, model, api_key), None
 
-# Example lecture content for the web app
-EXAMPLE_LECTURE = """Welcome to this short lecture on Artificial Intelligence. Let’s start with the basics. Artificial Intelligence, or AI, refers to the capability of machines to perform tasks that typically require human intelligence—things like understanding language, recognizing images, or making decisions. Within AI, one of the most important and widely used branches is Machine Learning, or ML. Machine Learning is all about teaching computers to learn from data. Instead of programming every rule manually, we feed the machine examples, and it learns patterns or rules from that data on its own.
+async def pipeline_async(input_text: str, progress_callback=None, *, provider: str = None, model: str = None, api_key: str = None):
+    """
+    Multi-agent pipeline function that processes lecture text into knowledge graph
+    Uses specialized agents for different tasks:
+    - Validation Agent: Content type classification and input filtering
+    - Summarization Agent: Optimized for content analysis and structured summarization
+    - Visualization Agent: Optimized for DOT code generation and graph syntax
+    
+    Args:
+        input_text (str): The content to process
+        progress_callback (callable): Optional callback function for progress updates
+        provider (str): AI provider to use (default: PROVIDER environment variable)
+        model (str): Model name to use (default: MODEL_NAME environment variable)
+        api_key (str): API key for the provider (default: the provider's API key environment variable)
+    
+    Returns:
+        tuple: (summary, dot_code) or (error_message, None) on failure
+    """
+    provider, model, api_key = _resolve_config(provider, model, api_key)
+    
+    # Serve repeated lectures from the response cache without calling any agent
+    cache_key = _response_cache_key(input_text, provider, model)
+    cached_result = RESPONSE_CACHE.get(cache_key)
+    if cached_result is not None:
+        logger.debug("⚡ Returning cached pipeline result")
+        return cached_result
+    
+    # Each step handles its own errors; a failed graph step keeps the cached summary
+    summarized, summary_or_error = await summarize_async(input_text, progress_callback, provider=provider, model=model, api_key=api_key)
+    if not summarized:
+        return summary_or_error, None
+    
+    result = await generate_graph_async(summary_or_error, progress_callback, provider=provider, model=model, api_key=api_key)
+    if result[1] is not None:
+        RESPONSE_CACHE.set(cache_key, result)
+    return result
+
+# Event loop shared by synchronous pipeline() callers. Cached LLM clients hold
+# async connection pools bound to the loop that first used them, so every sync
+# call must run on the same long-lived loop rather than a fresh asyncio.run().
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+def _get_background_loop():
+    """Get (starting on first use) the event loop that runs synchronous pipeline calls"""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_background_loop.run_forever,
+                name="lexigraph-pipeline-loop",
+                daemon=True,
+            ).start()
+    return _background_loop
+
+def _reset_after_fork():
+    """
+    Forked workers (e.g. gunicorn --preload) must not share the parent's connection pools,
+    and the parent's event loop thread does not exist in the child, so start from scratch
+    """
+    global _background_loop, _background_loop_lock, LLM_RATE_LIMITER
+    reset_agents()
+    _shared_async_http_client.cache_clear()
+    _model_semaphores.clear()
+    LLM_RATE_LIMITER = AsyncRateLimiter(LLM_RATE_LIMITER.max_requests, LLM_RATE_LIMITER.period)
+    _background_loop = None
+    _background_loop_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+@atexit.register
+def _close_shared_http_client():
+    """Close the shared connection pool on the loop that owns it so connections shut down cleanly"""
+    if _shared_async_http_client.cache_info().currsize == 0:
+        return
+    loop = _background_loop
+    if loop is None or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_shared_async_http_client().aclose(), loop).result(timeout=5)
+    except Exception as e:
+        logger.debug("Could not close shared HTTP client: %s", e)
+
+# Hosts of the providers served through the shared connection pool
+PROVIDER_WARMUP_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "openrouter": "https://openrouter.ai/api/v1",
+}
+
+async def _warm_up(urls: list[str]):
+    client = _shared_async_http_client()
+    responses = await asyncio.gather(*(client.head(url) for url in urls), return_exceptions=True)
+    for url, response in zip(urls, responses):
+        if isinstance(response, Exception):
+            logger.debug("Connection warm-up for %s failed: %s", url, response)
+
+def configured_providers() -> set[str]:
+    """Providers selected by PROVIDER or with an API key in the environment"""
+    providers = {provider for provider, key_env in PROVIDER_API_KEY_ENV.items() if os.getenv(key_env)}
+    if os.getenv("PROVIDER"):
+        providers.add(os.getenv("PROVIDER").lower())
+    return providers
 
-Machine learning comes in several types. The first is supervised learning, where we train the model using labeled data—that means we give it both the input and the correct output. For example, if we want to train a model to detect spam emails, we show it lots of examples of emails labeled as “spam” or “not spam,” and the model learns to predict that label. The second type is unsupervised learning, where the data has no labels at all. The algorithm’s job is to find hidden patterns or groupings. A good example here would be clustering customers based on their shopping behavior—without knowing their categories beforehand. Then we have semi-supervised learning, which is a mix of both: it uses a small amount of labeled data and a larger amount of unlabeled data to improve learning accuracy.
+def warm_up_connections(providers=None):
+    """
+    Open keep-alive connections to the providers in the background, so the first
+    pipeline call does not pay for DNS, TCP and TLS setup; any response will do
+    Anthropic clients keep their own pool inside the SDK and are not warmed here
+    
+    Args:
+        providers (iterable): Providers to warm up (default: configured_providers())
+    
+    Returns:
+        concurrent.futures.Future | None: Completes when the warm-up requests have finished;
+        None when there is nothing to warm up
+    """
+    if providers is None:
+        providers = configured_providers()
+    urls = [PROVIDER_WARMUP_URLS[provider] for provider in providers if provider in PROVIDER_WARMUP_URLS]
+    if not urls:
+        return None
+    return asyncio.run_coroutine_threadsafe(_warm_up(urls), _get_background_loop())
 
-Another major category is reinforcement learning. Here, the model—or we call it an agent—learns by interacting with an environment and receiving feedback in the form of rewards or penalties. A classic example is training a robot to walk or teaching an AI to play games like chess or Go. It tries actions, sees the result, and adjusts its behavior over time to maximize rewards.
+def pipeline(input_text: str, progress_callback=None, *, provider: str = None, model: str = None, api_key: str = None):
+    """
+    Synchronous wrapper around pipeline_async for callers without an event loop
+    
+    Args:
+        input_text (str): The content to process
+        progress_callback (callable): Optional callback function for progress updates
+        provider (str): AI provider to use (default: PROVIDER environment variable)
+        model (str): Model name to use (default: MODEL_NAME environment variable)
+        api_key (str): API key for the provider (default: the provider's API key environment variable)
+    
+    Returns:
+        tuple: (summary, dot_code) or (error_message, None) on failure
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        pipeline_async(input_text, progress_callback, provider=provider, model=model, api_key=api_key),
+        _get_background_loop(),
+    )
+    return future.result()
+
+async def run_pipeline(input_text: str, progress_callback=None, *, provider: str = None, model: str = None, api_key: str = None):
+    """
+    Await the pipeline from any event loop (e.g. a web server's) without tying up a thread;
+    it runs on the shared pipeline loop that owns the cached clients' connection pools
+    
+    Args:
+        input_text (str): The content to process
+        progress_callback (callable): Optional callback function for progress updates
+        provider (str): AI provider to use (default: PROVIDER environment variable)
+        model (str): Model name to use (default: MODEL_NAME environment variable)
+        api_key (str): API key for the provider (default: the provider's API key environment variable)
+    
+    Returns:
+        tuple: (summary, dot_code) or (error_message, None) on failure
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        pipeline_async(input_text, progress_callback, provider=provider, model=model, api_key=api_key),
+        _get_background_loop(),
+    )
+    return await asyncio.wrap_future(future)
+
+async def run_pipeline_many(inputs: list[str], max_concurrency: int = 8, *, provider: str = None, model: str = None, api_key: str = None):
+    """
+    Await pipeline_many from any event loop, running it on the shared pipeline loop
+    
+    Args:
+        inputs (list[str]): Lecture texts to process
+        max_concurrency (int): Maximum number of LLM requests in flight at once
+        provider (str): AI provider to use (default: PROVIDER environment variable)
+        model (str): Model name to use (default: MODEL_NAME environment variable)
+        api_key (str): API key for the provider (default: the provider's API key environment variable)
+    
+    Returns:
+        list[tuple]: One (summary, dot_code) or (error_message, None) per input, in order
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        pipeline_many(inputs, max_concurrency, provider=provider, model=model, api_key=api_key),
+        _get_background_loop(),
+    )
+    return await asyncio.wrap_future(future)
+
+async def pipeline_many(inputs: list[str], max_concurrency: int = 8, rate_limit_per_minute: int = None, *, provider: str = None, model: str = None, api_key: str = None) -> list[tuple]:
+    """
+    Process several lectures concurrently, sharing one concurrency limit and rate limiter;
+    each lecture moves on to graph generation as soon as its own summary is ready
+    
+    Args:
+        inputs (list[str]): Lecture texts to process
+        max_concurrency (int): Maximum number of LLM requests in flight at once
+        rate_limit_per_minute (int): Optional cap on LLM requests started per minute for this
+            batch, applied in addition to LLM_RATE_LIMITER (LLM_RPM)
+        provider (str): AI provider to use (default: PROVIDER environment variable)
+        model (str): Model name to use (default: MODEL_NAME environment variable)
+        api_key (str): API key for the provider (default: the provider's API key environment variable)
+    
+    Returns:
+        list[tuple]: One (summary, dot_code) or (error_message, None) per input, in order
+    """
+    provider, model, api_key = _resolve_config(provider, model, api_key)
+    results = [None] * len(inputs)
+    cache_keys = [_response_cache_key(text, provider, model) for text in inputs]
+    
+    # Cached and locally rejected inputs never reach an agent
+    summaries = {}
+    pending = []
+    locally_accepted = set()
+    for index, text in enumerate(inputs):
+        cached_result = RESPONSE_CACHE.get(cache_keys[index])
+        if cached_result is not None:
+            results[index] = cached_result
+            continue
+        cached_summary = SUMMARY_CACHE.get(cache_keys[index])
+        if cached_summary is not None:
+            summaries[index] = cached_summary
+            continue
+        local_verdict = precheck_content(text)
+        if local_verdict is False:
+            results[index] = (INVALID_CONTENT_ERROR, None)
+            continue
+        if _summary_exceeds_context(text, model):
+            results[index] = (CONTENT_TOO_LONG_ERROR, None)
+            continue
+        if local_verdict:
+            locally_accepted.add(index)
+        pending.append(index)
+    
+    if not pending and not summaries:
+        return results
+    
+    try:
+        validation_agent, summarization_agent, visualization_agent = _get_agents(provider, model, api_key)
+    except Exception as e:
+        error_msg = _pipeline_error(e, provider, model, api_key)
+        for index in (*pending, *summaries):
+            results[index] = (error_msg, None)
+        return results
+    
+    cache_static_prefix = provider == "anthropic"
+    rate_limiter = AsyncRateLimiter(rate_limit_per_minute) if rate_limit_per_minute else None
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def invoke(agent, messages):
+        return await _invoke_agent(agent, messages, rate_limiter, semaphore)
+    
+    async def summarize(index):
+        """Validate and summarize one input; returns None when it is not a lecture"""
+        text = inputs[index]
+        if FUSE_VALIDATION:
+            response = await invoke(summarization_agent, build_validate_and_summarize_messages(text, cache_static_prefix))
+            is_valid, summary = _split_validation_tag(_message_text(response))
+            return summary if is_valid else None
+        
+        if index not in locally_accepted:
+            response = await invoke(validation_agent, build_validation_messages(text, cache_static_prefix))
+            if "INVALID" in _message_text(response).strip().upper():
+                return None
+        return _message_text(await invoke(summarization_agent, build_summarization_messages(text, cache_static_prefix)))
+    
+    async def process(index):
+        try:
+            summary = summaries.get(index)
+            if summary is None:
+                summary = await summarize(index)
+                if summary is None:
+                    results[index] = (INVALID_CONTENT_ERROR, None)
+                    return
+                if not summary or summary.isspace():
+                    results[index] = (EMPTY_SUMMARY_ERROR, None)
+                    return
+                SUMMARY_CACHE.set(cache_keys[index], summary)
+            
+            dot_code_raw = summary_to_dot(summary) if DOT_FROM_SUMMARY else ""
+            if not dot_code_raw:
+                dot_code_raw = _message_text(await invoke(visualization_agent, build_dot_messages(summary, cache_static_prefix)))
+            result = _finalize_dot_code(summary, dot_code_raw)
+            if result[1] is not None:
+                RESPONSE_CACHE.set(cache_keys[index], result)
+            results[index] = result
+        except Exception as e:
+            results[index] = (_pipeline_error(e, provider, model, api_key), None)
+    
+    await asyncio.gather(*(process(index) for index in (*pending, *summaries)))
+    return results
 
-Now, within machine learning, there's a very powerful subfield called deep learning. Deep learning uses neural networks with many layers, and it has completely transformed what we can do with AI. These deep neural networks are excellent at automatically learning complex features from data, especially in areas like image recognition, speech processing, and natural language understanding. Deep learning is what powers technologies like self-driving cars, facial recognition, and even language models like ChatGPT.
+# Example lecture content for the web app, read from disk only when first requested
+@cache
+def get_example_lecture() -> str:
+    """Load the bundled example lecture (cached after the first read)"""
+    resource = importlib.resources.files(__package__).joinpath("examples/ai_lecture.txt")
+    return resource.read_text(encoding="utf-8").rstrip("\n")
 
-To summarize: AI is the broad field. Machine learning is a subset that lets computers learn from data. And deep learning is a further subset that uses multi-layered neural networks to learn high-level patterns. Each type of learning—supervised, unsupervised, semi-supervised, and reinforcement—has its strengths depending on the problem you’re trying to solve. And understanding which one to use is a big part of becoming proficient in AI."""
+def __getattr__(name: str):
+    # Keep `pipeline.EXAMPLE_LECTURE` working without building the string at import time
+    if name == "EXAMPLE_LECTURE":
+        return get_example_lecture()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,106 @@
+"""
+Retry and rate limiting helpers for outbound LLM calls
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors and overload
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Provider SDK exception names that signal a transient failure
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError",
+    "APITimeoutError",
+    "APIConnectionError",
+    "InternalServerError",
+    "OverloadedError",
+    "ServiceUnavailableError",
+}
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Check whether an exception from a provider call is transient and worth retrying
+
+    Args:
+        error (BaseException): The exception raised by the call
+
+    Returns:
+        bool: True for rate limits, timeouts, connection errors and server errors
+    """
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+async def retry_async(func, *args, attempts: int = 4, initial_delay: float = 1.0, max_delay: float = 30.0, **kwargs):
+    """
+    Await func(*args, **kwargs), retrying transient errors with exponential backoff and jitter
+
+    Args:
+        func (callable): Coroutine function to call
+        attempts (int): Maximum number of attempts including the first one
+        initial_delay (float): Base delay in seconds before the first retry
+        max_delay (float): Upper bound for a single delay in seconds
+
+    Returns:
+        The result of the first successful call; the last error is re-raised when all attempts fail
+    """
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(attempts),
+        wait=wait_exponential_jitter(initial=initial_delay, max=max_delay),
+        retry=retry_if_exception(is_retryable_error),
+        reraise=True,
+    ):
+        with attempt:
+            return await func(*args, **kwargs)
+
+class AsyncRateLimiter:
+    """
+    Token bucket limiting how many requests may start per period (0 disables the limit)
+    The bucket is shared by every event loop using the limiter; waiters queue per loop
+    """
+
+    def __init__(self, max_requests: int, period: float = 60.0):
+        self.max_requests = max_requests
+        self.period = period
+        self._tokens = float(max_requests)
+        self._updated = time.monotonic()
+        self._state_lock = threading.Lock()
+        self._loop_locks = weakref.WeakKeyDictionary()
+
+    def _loop_lock(self) -> asyncio.Lock:
+        """asyncio.Lock for the running event loop (a lock can only be waited on from one loop)"""
+        loop = asyncio.get_running_loop()
+        with self._state_lock:
+            lock = self._loop_locks.get(loop)
+            if lock is None:
+                lock = self._loop_locks[loop] = asyncio.Lock()
+            return lock
+
+    def _try_take(self) -> float:
+        """Take a token if one is available; returns 0, or the seconds until the next token"""
+        with self._state_lock:
+            now = time.monotonic()
+            refill = (now - self._updated) * self.max_requests / self.period
+            self._tokens = min(float(self.max_requests), self._tokens + refill)
+            self._updated = now
+            
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) * self.period / self.max_requests
+
+    async def acquire(self):
+        """Wait until a request may start"""
+        if self.max_requests <= 0:
+            return
+
+        async with self._loop_lock():
+            while (delay := self._try_take()) > 0:
+                await asyncio.sleep(delay)
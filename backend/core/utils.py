@@ -4,16 +4,115 @@ Utility functions for graph generation and file management
 
 import os
 import time
-import shutil
-import requests
+import logging
 import re
-import base64
-from pathlib import Path
+import secrets
+import textwrap
+from functools import lru_cache
 from urllib.parse import quote
 
+logger = logging.getLogger(__name__)
+
+# Patterns used by clean_dot_code, compiled once at import
+# Markdown code blocks with optional language specification: ```dot, ```graphviz, ```DOT, or just ```
+_MARKDOWN_BLOCK_RE = re.compile(r'```(?:dot|graphviz|DOT)?\s*\n?(.*?)\n?```', re.DOTALL | re.IGNORECASE)
+_EDGE_BACKTICKS_RE = re.compile(r'^`+|`+$')
+# Boilerplate LLM prefixes and suffixes, each optional and removed in this order
+_LLM_PREFIX_RE = re.compile(
+    r"^(?:Here's the DOT code:?\s*)?"
+    r"(?:The DOT code is:?\s*)?"
+    r"(?:DOT code:?\s*)?"
+    r"(?:Graph:?\s*)?"
+    r"(?:Here is the digraph:?\s*)?",
+    re.IGNORECASE,
+)
+_LLM_SUFFIX_RE = re.compile(
+    r"(?:\s*Hope this helps!?\.?)?"
+    r"(?:\s*The graph is now ready\.?)?"
+    r"(?:\s*This creates the knowledge graph\.?)?$",
+    re.IGNORECASE,
+)
+# First and last characters those prefixes and suffixes can have, to skip the regexes cheaply
+_LLM_PREFIX_FIRST_CHARS = frozenset("HTDGhtdg")
+_LLM_SUFFIX_LAST_CHARS = frozenset(".!hysHYS")
+_DOT_HEADER_RE = re.compile(r'^\s*(di)?graph\s+', re.IGNORECASE)
+_DOT_BODY_RE = re.compile(r'((?:di)?graph\s+.*)', re.DOTALL | re.IGNORECASE)
+# Header of output that is nothing but a graph statement: (di)graph [ID] {
+_BARE_GRAPH_START_RE = re.compile(r'(?:di)?graph\s*(?:"[^"\n]*"|[\w.]+)?\s*\{', re.IGNORECASE)
+
+# Quoted strings and comments, whose braces do not count towards the graph structure
+_DOT_STRING_OR_COMMENT_RE = re.compile(r'"(?:[^"\\]|\\.)*"|//[^\n]*|/\*.*?\*/|^\s*#[^\n]*', re.DOTALL | re.MULTILINE)
+
+# Opening of a graph statement in streamed output: [strict] (di)graph [ID] {
+_DOT_STREAM_START_RE = re.compile(r'\b(?:strict\s+)?(?:di)?graph\s*(?:"[^"\n]*"|[\w.]+)?\s*\{', re.IGNORECASE)
+
+class DotStreamCleaner:
+    """
+    Incrementally extract the DOT graph from streamed LLM output
+    Text before the graph header (markdown fences, prose) is dropped, and the stream is
+    marked complete once the graph's closing brace arrives so generation can stop early
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+        self._pending = ""
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Consume a streamed chunk
+        
+        Args:
+            chunk (str): Next piece of raw LLM output
+        
+        Returns:
+            str: The newly extracted DOT text (empty until the graph header is seen)
+        """
+        if self.complete or not chunk:
+            return ""
+        
+        if not self.text:
+            self._pending += chunk
+            match = _DOT_STREAM_START_RE.search(self._pending)
+            if not match:
+                return ""
+            chunk = self._pending[match.start():]
+            self._pending = ""
+        
+        emitted = []
+        for char in chunk:
+            emitted.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    break
+        
+        new_text = "".join(emitted)
+        self.text += new_text
+        return new_text
+
+# Outputs longer than this are cleaned without being kept in the cache
+CLEAN_CACHE_MAX_CHARS = 1_000_000
+
 def clean_dot_code(raw_output: str) -> str:
     """
     Clean DOT code from LLM output by removing markdown syntax and extracting pure DOT code
+    Results are cached, since the same output is cleaned again on retries and repeated compiles
     
     Args:
         raw_output (str): Raw output from LLM that may contain markdown formatting
@@ -21,59 +120,145 @@ def clean_dot_code(raw_output: str) -> str:
     Returns:
         str: Clean DOT code without markdown syntax
     """
+    if raw_output and len(raw_output) < CLEAN_CACHE_MAX_CHARS:
+        return _clean_dot_code_cached(raw_output)
+    return _clean_dot_code(raw_output)
+
+@lru_cache(maxsize=128)
+def _clean_dot_code_cached(raw_output: str) -> str:
+    return _clean_dot_code(raw_output)
+
+def _clean_dot_code(raw_output: str) -> str:
     if not raw_output or not raw_output.strip():
         return ""
     
     # Remove leading/trailing whitespace
     cleaned = raw_output.strip()
     
+    # Output that is already a bare graph statement only needs the color fixes
+    if not (cleaned.endswith('}') and '`' not in cleaned and _BARE_GRAPH_START_RE.match(cleaned)):
+        cleaned = _extract_dot_statement(cleaned)
+    
+    # Patterns 6 and 7: Fix color attributes for filled nodes (color should be fillcolor
+    # for the background) and replace unsupported colors, in one pass over the code
+    cleaned = _rewrite_colors(cleaned, fix_fill=_has_filled_style(cleaned), fix_unsupported=True)
+    
+    return cleaned.strip()
+
+def _extract_dot_statement(cleaned: str) -> str:
+    """Strip markdown fences and LLM boilerplate around the graph statement"""
     # Pattern 1: Remove markdown code blocks with optional language specification
-    # Matches: ```dot, ```graphviz, ```DOT, or just ```
-    markdown_pattern = r'```(?:dot|graphviz|DOT)?\s*\n?(.*?)\n?```'
-    match = re.search(markdown_pattern, cleaned, re.DOTALL | re.IGNORECASE)
-    if match:
-        cleaned = match.group(1).strip()
+    if '```' in cleaned:
+        match = _MARKDOWN_BLOCK_RE.search(cleaned)
+        if match:
+            cleaned = match.group(1).strip()
     
     # Pattern 2: Remove any remaining backticks at start/end
-    cleaned = re.sub(r'^`+|`+$', '', cleaned).strip()
-    
-    # Pattern 3: Remove common LLM prefixes/suffixes
-    prefixes_to_remove = [
-        r'^Here\'s the DOT code:?\s*',
-        r'^The DOT code is:?\s*',
-        r'^DOT code:?\s*',
-        r'^Graph:?\s*',
-        r'^Here is the digraph:?\s*'
-    ]
+    if cleaned.startswith('`') or cleaned.endswith('`'):
+        cleaned = _EDGE_BACKTICKS_RE.sub('', cleaned).strip()
     
-    for prefix in prefixes_to_remove:
-        cleaned = re.sub(prefix, '', cleaned, flags=re.IGNORECASE).strip()
+    # Pattern 3: Remove common LLM prefixes
+    if cleaned[:1] in _LLM_PREFIX_FIRST_CHARS:
+        cleaned = _LLM_PREFIX_RE.sub('', cleaned, count=1).strip()
     
     # Pattern 4: Remove common suffixes
-    suffixes_to_remove = [
-        r'\s*This creates the knowledge graph\.?$',
-        r'\s*The graph is now ready\.?$',
-        r'\s*Hope this helps!?\.?$'
-    ]
-    
-    for suffix in suffixes_to_remove:
-        cleaned = re.sub(suffix, '', cleaned, flags=re.IGNORECASE).strip()
+    if cleaned[-1:] in _LLM_SUFFIX_LAST_CHARS:
+        cleaned = _LLM_SUFFIX_RE.sub('', cleaned, count=1).strip()
     
     # Pattern 5: Ensure the code starts with 'digraph' or 'graph'
-    if not re.match(r'^\s*(di)?graph\s+', cleaned, re.IGNORECASE):
+    if not _DOT_HEADER_RE.match(cleaned):
         # Try to find the start of a digraph in the text
-        digraph_match = re.search(r'((?:di)?graph\s+.*)', cleaned, re.DOTALL | re.IGNORECASE)
+        digraph_match = _DOT_BODY_RE.search(cleaned)
         if digraph_match:
             cleaned = digraph_match.group(1)
     
-    # Pattern 6: Fix color attributes for filled nodes
-    # When style=filled is used, color should be fillcolor for background
-    cleaned = fix_color_attributes(cleaned)
+    return cleaned
+
+# Unsupported light colors mapped to lighter, more readable basic colors that work with QuickChart
+UNSUPPORTED_COLOR_MAP = {
+    'lightgray': 'white',       # Use white instead of gray for better readability
+    'lightgrey': 'white', 
+    'lightblue': 'cyan',        # Use cyan instead of blue for better readability
+    'lightgreen': 'yellow',     # Use yellow instead of green for better readability  
+    'lightcyan': 'cyan',
+    'lightpink': 'pink',
+    'lightyellow': 'yellow',
+    'lightsalmon': 'orange',
+    'lightcoral': 'pink',
+    'lightsteelblue': 'cyan',
+    'lightseagreen': 'yellow',
+    'lightslategray': 'white',
+    'lightslategrey': 'white',
+}
+
+# Fill colors that need white text for good contrast; every other fill gets black text
+DARK_FILL_COLORS = frozenset({'blue', 'purple', 'red', 'green'})
+
+# Attribute list of a node, edge or default statement: Name [attributes]
+_ATTR_BLOCK_PATTERN = r'(?P<prefix>\w+\s*\[)(?P<attributes>[^\]]+)(?P<suffix>\])'
+# Any *color attribute set to an unsupported color, quoted or not
+_UNSUPPORTED_COLOR_PATTERN = (
+    r'(?P<attr>\w*color=)(?P<quote>"?)(?P<color>'
+    + '|'.join(sorted(map(re.escape, UNSUPPORTED_COLOR_MAP), key=len, reverse=True))
+    + r')(?P=quote)(?!\w)'
+)
+_UNSUPPORTED_COLOR_RE = re.compile(_UNSUPPORTED_COLOR_PATTERN)
+# Attribute list or, outside of one, a single unsupported color attribute; named groups
+# keep each branch's groups addressable however the patterns are combined
+_COLOR_REWRITE_RE = re.compile(_ATTR_BLOCK_PATTERN + '|' + _UNSUPPORTED_COLOR_PATTERN)
+_LIGHT_COLOR_ATTR_RE = re.compile(r'(?<!\w)color=("?)(light\w+)\1')
+_FILLCOLOR_RE = re.compile(r'fillcolor=(["\']?)(\w+)\1')
+_FONTCOLOR_RE = re.compile(r'fontcolor=(["\']?)\w+\1')
+
+def _replace_unsupported_color(match) -> str:
+    quote = match.group('quote')
+    return match.group('attr') + quote + UNSUPPORTED_COLOR_MAP[match.group('color')] + quote
+
+def _rewrite_colors(dot_code: str, fix_fill: bool, fix_unsupported: bool) -> str:
+    """
+    Apply the color fixes in a single left-to-right pass over the DOT code
+    
+    Args:
+        dot_code (str): DOT code to fix
+        fix_fill (bool): Turn color=light* into fillcolor and give nodes an explicit black fontcolor
+        fix_unsupported (bool): Map unsupported colors and pick a fontcolor contrasting with the fill
     
-    # Pattern 7: Replace unsupported colors with basic supported colors
-    cleaned = fix_unsupported_colors(cleaned)
+    Returns:
+        str: The rewritten DOT code
+    """
+    def rewrite(match):
+        prefix, attributes, suffix = match.group('prefix', 'attributes', 'suffix')
+        if prefix is None:
+            # An unsupported color outside of any attribute list
+            return _replace_unsupported_color(match) if fix_unsupported else match.group(0)
+        
+        if fix_fill:
+            attributes = _LIGHT_COLOR_ATTR_RE.sub(r'fillcolor=\1\2\1', attributes)
+        if fix_unsupported:
+            attributes = _UNSUPPORTED_COLOR_RE.sub(_replace_unsupported_color, attributes)
+        
+        fontcolor = None
+        if fix_unsupported:
+            fillcolor_match = _FILLCOLOR_RE.search(attributes)
+            if fillcolor_match:
+                fontcolor = 'white' if fillcolor_match.group(2).lower() in DARK_FILL_COLORS else 'black'
+        if fontcolor is None and fix_fill and 'fontcolor=' not in attributes:
+            fontcolor = 'black'
+        
+        if fontcolor is not None:
+            if 'fontcolor=' in attributes:
+                attributes = _FONTCOLOR_RE.sub('fontcolor=' + fontcolor, attributes)
+            elif attributes.strip().endswith(','):
+                attributes += ' fontcolor=' + fontcolor
+            else:
+                attributes += ', fontcolor=' + fontcolor
+        
+        return prefix + attributes + suffix
     
-    return cleaned.strip()
+    return _COLOR_REWRITE_RE.sub(rewrite, dot_code)
+
+def _has_filled_style(dot_code: str) -> bool:
+    return 'style=filled' in dot_code or 'style="filled"' in dot_code
 
 def fix_color_attributes(dot_code: str) -> str:
     """
@@ -85,75 +270,13 @@ def fix_color_attributes(dot_code: str) -> str:
     Returns:
         str: DOT code with fixed color attributes
     """
-    if not dot_code:
+    if not dot_code or not _has_filled_style(dot_code):
         return dot_code
     
-    # Check if the graph uses style=filled globally or on nodes
-    has_filled_style = 'style=filled' in dot_code or 'style="filled"' in dot_code
-    
-    if has_filled_style:
-        print("🎨 Fixing color attributes for filled nodes...")
-        
-        # Replace color=lightXXX with fillcolor=lightXXX in node definitions
-        # Pattern matches: NodeName [attributes with color=lightcolor, other_attrs];
-        color_pattern = r'(\w+\s*\[(?:[^,\]]*,\s*)*)(color=light\w+)((?:\s*,\s*[^,\]]*)*\])'
-        
-        def replace_color(match):
-            prefix = match.group(1)  # NodeName [other_attrs,
-            color_attr = match.group(2)  # color=lightblue
-            suffix = match.group(3)  # , other_attrs]
-            
-            # Replace color= with fillcolor=
-            fillcolor_attr = color_attr.replace('color=', 'fillcolor=')
-            
-            print(f"  🔧 Fixing: {color_attr} → {fillcolor_attr}")
-            return prefix + fillcolor_attr + suffix
-        
-        cleaned = re.sub(color_pattern, replace_color, dot_code)
-        
-        # Also handle quoted color values: color="lightblue"
-        quoted_color_pattern = r'(\w+\s*\[(?:[^,\]]*,\s*)*)(color="light\w+")((?:\s*,\s*[^,\]]*)*\])'
-        
-        def replace_quoted_color(match):
-            prefix = match.group(1)
-            color_attr = match.group(2)  # color="lightblue"
-            suffix = match.group(3)
-            
-            fillcolor_attr = color_attr.replace('color=', 'fillcolor=')
-            print(f"  🔧 Fixing: {color_attr} → {fillcolor_attr}")
-            return prefix + fillcolor_attr + suffix
-        
-        cleaned = re.sub(quoted_color_pattern, replace_quoted_color, cleaned)
-        
-        # Add explicit fontcolor=black for all nodes to ensure text visibility
-        # This prevents text from being invisible when fillcolor is applied
-        print("🎨 Adding explicit fontcolor=black for text visibility...")
-        
-        # Pattern to find node definitions and add fontcolor if missing
-        node_pattern = r'(\w+\s*\[)([^\]]+)(\])'
-        
-        def ensure_fontcolor(match):
-            prefix = match.group(1)  # NodeName [
-            attributes = match.group(2)  # all attributes
-            suffix = match.group(3)  # ]
-            
-            # Check if fontcolor is already specified
-            if 'fontcolor=' not in attributes:
-                # Add fontcolor=black to ensure text is visible
-                if attributes.strip().endswith(','):
-                    new_attributes = attributes + ' fontcolor=black'
-                else:
-                    new_attributes = attributes + ', fontcolor=black'
-                print(f"  ✏️ Adding fontcolor=black to node")
-                return prefix + new_attributes + suffix
-            
-            return prefix + attributes + suffix
-        
-        cleaned = re.sub(node_pattern, ensure_fontcolor, cleaned)
-        
-        return cleaned
-    
-    return dot_code
+    # When style=filled is used, color=lightXXX should be the fillcolor, and every node gets
+    # an explicit fontcolor so text stays visible on the fill
+    logger.debug("🎨 Fixing color attributes for filled nodes...")
+    return _rewrite_colors(dot_code, fix_fill=True, fix_unsupported=False)
 
 def fix_unsupported_colors(dot_code: str) -> str:
     """
@@ -169,106 +292,13 @@ def fix_unsupported_colors(dot_code: str) -> str:
     if not dot_code:
         return dot_code
     
-    print("🎨 Converting unsupported colors to basic supported colors with proper text contrast...")
-    
-    # Mapping of unsupported colors to lighter, more readable alternatives
-    color_mapping = {
-        'lightgray': 'white',       # Use white instead of gray for better readability
-        'lightgrey': 'white', 
-        'lightblue': 'cyan',        # Use cyan instead of blue for better readability
-        'lightgreen': 'yellow',     # Use yellow instead of green for better readability  
-        'lightcyan': 'cyan',
-        'lightpink': 'pink',
-        'lightyellow': 'yellow',
-        'lightsalmon': 'orange',
-        'lightcoral': 'pink',
-        'lightsteelblue': 'cyan',
-        'lightseagreen': 'yellow',
-        'lightslategray': 'white',
-        'lightslategrey': 'white',
-    }
-    
-    # Colors that need white text for good contrast
-    dark_colors = {'blue', 'purple', 'red', 'green'}
-    # Colors that work well with black text
-    light_colors = {'white', 'yellow', 'cyan', 'pink', 'orange', 'gray'}
-    
-    # Replace both fillcolor and color attributes
-    for unsupported, supported in color_mapping.items():
-        # Replace fillcolor=lightcolor
-        pattern1 = rf'fillcolor={unsupported}\b'
-        replacement1 = f'fillcolor={supported}'
-        if re.search(pattern1, dot_code):
-            print(f"  🔧 Replacing: fillcolor={unsupported} → fillcolor={supported}")
-            dot_code = re.sub(pattern1, replacement1, dot_code)
-        
-        # Replace fillcolor="lightcolor"
-        pattern2 = rf'fillcolor="{unsupported}"\b'
-        replacement2 = f'fillcolor="{supported}"'
-        if re.search(pattern2, dot_code):
-            print(f"  🔧 Replacing: fillcolor=\"{unsupported}\" → fillcolor=\"{supported}\"")
-            dot_code = re.sub(pattern2, replacement2, dot_code)
-        
-        # Replace color=lightcolor (in case some still exist)
-        pattern3 = rf'color={unsupported}\b'
-        replacement3 = f'color={supported}'
-        if re.search(pattern3, dot_code):
-            print(f"  🔧 Replacing: color={unsupported} → color={supported}")
-            dot_code = re.sub(pattern3, replacement3, dot_code)
-        
-        # Replace color="lightcolor"
-        pattern4 = rf'color="{unsupported}"\b'
-        replacement4 = f'color="{supported}"'
-        if re.search(pattern4, dot_code):
-            print(f"  🔧 Replacing: color=\"{unsupported}\" → color=\"{supported}\"")
-            dot_code = re.sub(pattern4, replacement4, dot_code)
-    
-    # Now fix font colors based on background colors for better contrast
-    print("🎨 Optimizing text contrast based on background colors...")
-    
-    # Pattern to find nodes with fillcolor and adjust fontcolor accordingly
-    node_pattern = r'(\w+\s*\[)([^\]]+)(\])'
-    
-    def optimize_text_contrast(match):
-        prefix = match.group(1)  # NodeName [
-        attributes = match.group(2)  # all attributes
-        suffix = match.group(3)  # ]
-        
-        # Extract fillcolor if present
-        fillcolor_match = re.search(r'fillcolor=(["\']?)(\w+)\1', attributes)
-        if fillcolor_match:
-            color = fillcolor_match.group(2).lower()
-            
-            # Determine optimal font color based on background
-            if color in dark_colors:
-                optimal_fontcolor = 'white'
-            else:
-                optimal_fontcolor = 'black'
-            
-            # Update or add fontcolor
-            if re.search(r'fontcolor=', attributes):
-                # Replace existing fontcolor
-                new_attributes = re.sub(r'fontcolor=(["\']?)\w+\1', f'fontcolor={optimal_fontcolor}', attributes)
-                print(f"  ✏️ Updated fontcolor to {optimal_fontcolor} for {color} background")
-            else:
-                # Add fontcolor
-                if attributes.strip().endswith(','):
-                    new_attributes = attributes + f' fontcolor={optimal_fontcolor}'
-                else:
-                    new_attributes = attributes + f', fontcolor={optimal_fontcolor}'
-                print(f"  ✏️ Added fontcolor={optimal_fontcolor} for {color} background")
-            
-            return prefix + new_attributes + suffix
-        
-        return prefix + attributes + suffix
-    
-    dot_code = re.sub(node_pattern, optimize_text_contrast, dot_code)
-    
-    return dot_code
+    logger.debug("🎨 Converting unsupported colors to basic supported colors with proper text contrast...")
+    return _rewrite_colors(dot_code, fix_fill=False, fix_unsupported=True)
 
 def validate_dot_syntax(dot_code: str) -> tuple[bool, str]:
     """
-    Validate DOT syntax using QuickChart API
+    Validate DOT syntax locally (graph keyword and balanced braces)
+    QuickChart itself is only contacted when the image is loaded
     
     Args:
         dot_code (str): DOT code to validate
@@ -277,41 +307,95 @@ def validate_dot_syntax(dot_code: str) -> tuple[bool, str]:
         tuple[bool, str]: (is_valid, error_message)
     """
     try:
-        print("🔍 Validating DOT syntax using QuickChart API...")
-        
         if not dot_code or not dot_code.strip():
             return False, "DOT code is empty"
         
-        # Basic syntax checks
-        dot_code_lower = dot_code.lower().strip()
-        
         # Check if it starts with digraph or graph
-        if not (dot_code_lower.startswith('digraph') or dot_code_lower.startswith('graph')):
+        dot_code_start = dot_code.lstrip()[:7].lower()
+        if not dot_code_start.startswith(('digraph', 'graph')):
             return False, "DOT code must start with 'digraph' or 'graph'"
         
-        # Check for balanced braces
-        open_braces = dot_code.count('{')
-        close_braces = dot_code.count('}')
+        # Check for balanced braces, ignoring any inside labels or comments
+        structure = dot_code
+        if '"' in structure or '/' in structure or '#' in structure:
+            structure = _DOT_STRING_OR_COMMENT_RE.sub('', structure)
+        open_braces = structure.count('{')
+        close_braces = structure.count('}')
         if open_braces != close_braces:
             return False, f"Unbalanced braces: {open_braces} opening, {close_braces} closing"
         
-        # Try to validate with QuickChart API (just test the request)
-        encoded_dot = quote(dot_code)
-        test_url = f"https://quickchart.io/graphviz?graph={encoded_dot}"
+        return True, "Valid DOT syntax"
         
-        # Make a HEAD request to check if the API would accept it
-        response = requests.head(test_url, timeout=10)
-        if response.status_code == 200:
-            print("✅ DOT syntax validation passed")
-            return True, "Valid DOT syntax"
-        else:
-            return False, f"QuickChart API validation failed with status {response.status_code}"
-            
     except Exception as e:
         error_details = f"DOT syntax validation failed: {str(e)}"
-        print(f"❌ {error_details}")
+        logger.warning("❌ %s", error_details)
         return False, error_details
 
+# Light fill colors per summary level, cycled for deeper levels (readable with black text)
+SUMMARY_LEVEL_COLORS = ("white", "yellow", "cyan", "pink", "orange")
+SUMMARY_LABEL_WIDTH = 40
+
+def _dot_label(text: str) -> str:
+    """Escape text for a quoted DOT label, wrapping long lines"""
+    lines = textwrap.wrap(text, SUMMARY_LABEL_WIDTH, break_long_words=False, break_on_hyphens=False)
+    return "\\n".join(line.replace("\\", "\\\\").replace('"', '\\"') for line in lines)
+
+def summary_to_dot(summary: str) -> str:
+    """
+    Build DOT code directly from a hierarchical summary, without an LLM call
+    
+    Lines without hyphens are topics; each leading hyphen adds one level below the
+    nearest shallower item. A topic repeating an earlier item's text reuses that node,
+    so separate sections of the summary stay connected.
+    
+    Args:
+        summary (str): Summary in the "Topic:" / "- Subtopic" / "-- Detail" format
+    
+    Returns:
+        str: DOT code, or an empty string if the summary has no hierarchy to draw
+    """
+    node_lines = []
+    edge_lines = []
+    nodes_by_text = {}
+    stack = []  # (depth, node_id) of the current ancestors
+    
+    for line in summary.splitlines():
+        item = line.strip()
+        if not item:
+            continue
+        text = item.lstrip("-")
+        depth = len(item) - len(text)
+        text = text.strip().rstrip(":").strip()
+        if not text:
+            continue
+        
+        key = text.casefold()
+        if depth == 0 and key in nodes_by_text:
+            node_id = nodes_by_text[key]
+        else:
+            node_id = f"n{len(node_lines)}"
+            nodes_by_text.setdefault(key, node_id)
+            color = SUMMARY_LEVEL_COLORS[depth % len(SUMMARY_LEVEL_COLORS)]
+            node_lines.append(f'    {node_id} [label="{_dot_label(text)}", fillcolor={color}];')
+        
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        if stack:
+            edge_lines.append(f"    {stack[-1][1]} -> {node_id};")
+        stack.append((depth, node_id))
+    
+    if not edge_lines:
+        return ""
+    
+    return "\n".join([
+        "digraph Summary {",
+        "    rankdir=LR;",
+        "    node [shape=box, style=filled, fontcolor=black];",
+        *node_lines,
+        *edge_lines,
+        "}",
+    ])
+
 def compile_dot_to_png(dot_code: str, output_filename: str, output_dir: str = "output"):
     """
     Compile DOT code into a PNG image file using QuickChart API
@@ -325,78 +409,52 @@ def compile_dot_to_png(dot_code: str, output_filename: str, output_dir: str = "o
         tuple: (file_path, base64_image_data) or (None, None) on failure
     """
     try:
-        print(f"🔧 Starting DOT compilation using QuickChart API for file: {output_filename}")
-        print(f"📁 Output directory: {output_dir}")
+        logger.debug("🔧 Starting DOT compilation using QuickChart API for file: %s (output directory: %s)", output_filename, output_dir)
         
         # Clean the DOT code first
-        print("🧹 Cleaning DOT code...")
-        original_length = len(dot_code)
         cleaned_dot = clean_dot_code(dot_code)
-        cleaned_length = len(cleaned_dot)
-        
-        print(f"📏 Original code length: {original_length} characters")
-        print(f"📏 Cleaned code length: {cleaned_length} characters")
+        logger.debug("📏 Original code length: %d characters, cleaned: %d characters", len(dot_code), len(cleaned_dot))
         
         if not cleaned_dot.strip():
-            error_msg = "❌ DOT code is empty after cleaning"
-            print(error_msg)
-            print(f"📝 Original DOT code:\n{'-'*50}")
-            print(dot_code)
-            print(f"{'-'*50}")
+            logger.warning("❌ DOT code is empty after cleaning")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📝 Original DOT code:\n%s\n%s\n%s", "-" * 50, dot_code, "-" * 50)
             return None, None
         
         # Show the cleaned DOT code for debugging
-        print(f"📝 Cleaned DOT code:\n{'-'*50}")
-        print(cleaned_dot)
-        print(f"{'-'*50}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📝 Cleaned DOT code:\n%s\n%s\n%s", "-" * 50, cleaned_dot, "-" * 50)
         
         # Validate the cleaned DOT code
-        print("🔍 Validating DOT syntax...")
         is_valid, error_msg = validate_dot_syntax(cleaned_dot)
         if not is_valid:
-            print(f"❌ Validation failed: {error_msg}")
+            logger.warning("❌ Validation failed: %s", error_msg)
             return None, None
         
-        print("✅ DOT syntax validation passed")
-        
         # Ensure output directory exists
-        print(f"📂 Ensuring output directory exists: {output_dir}")
         os.makedirs(output_dir, exist_ok=True)
         
-        # Generate the graph using QuickChart API
-        print("🎨 Generating PNG from DOT code using QuickChart API...")
-        
         # URL encode the DOT code
         encoded_dot = quote(cleaned_dot)
         api_url = f"https://quickchart.io/graphviz?graph={encoded_dot}"
-        
-        print(f"🌐 Generated QuickChart URL")
-        print(f"📏 Encoded DOT length: {len(encoded_dot)} characters")
-        print(f"🔗 Direct URL: {api_url}")
+        logger.debug("🌐 Generated QuickChart URL (encoded DOT length: %d characters)", len(encoded_dot))
         
         # Return the direct URL instead of making the API call
         # This is much more efficient and follows best practices
-        print("✅ Returning direct QuickChart URL for frontend to use")
         
         return None, api_url  # Return URL as the "image data"
         
     except Exception as e:
-        error_msg = f"❌ DOT compilation failed: {str(e)}"
-        print(error_msg)
-        print(f"📝 DOT code that failed:\n{'-'*50}")
-        print(dot_code)
-        print(f"{'-'*50}")
-        
-        # Print detailed exception information
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+        # Log the failure with the full traceback
+        logger.exception("❌ DOT compilation failed: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📝 DOT code that failed:\n%s\n%s\n%s", "-" * 50, dot_code, "-" * 50)
         
         return None, None
 
 def generate_unique_filename():
-    """Generate a unique filename based on timestamp"""
-    return f"graph_{int(time.time())}"
+    """Generate a unique filename from the timestamp and a random suffix, so requests in the same second never collide"""
+    return f"graph_{int(time.time())}_{secrets.token_hex(4)}"
 
 def cleanup_old_files(output_dir: str = "output", max_age_hours: int = 24):
     """
@@ -413,16 +471,17 @@ def cleanup_old_files(output_dir: str = "output", max_age_hours: int = 24):
         current_time = time.time()
         max_age_seconds = max_age_hours * 3600
         
-        for filename in os.listdir(output_dir):
-            file_path = os.path.join(output_dir, filename)
-            if os.path.isfile(file_path):
-                file_age = current_time - os.path.getctime(file_path)
-                if file_age > max_age_seconds:
-                    os.remove(file_path)
-                    print(f"Cleaned up old file: {filename}")
+        # scandir entries carry the file type and stat result from the directory read
+        with os.scandir(output_dir) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    file_age = current_time - entry.stat(follow_symlinks=False).st_ctime
+                    if file_age > max_age_seconds:
+                        os.remove(entry.path)
+                        logger.info("Cleaned up old file: %s", entry.name)
                     
     except Exception as e:
-        print(f"Error during cleanup: {e}")
+        logger.warning("Error during cleanup: %s", e)
 
 def validate_input_text(text: str, min_length: int = 50) -> tuple[bool, str]:
     """
@@ -435,17 +494,26 @@ def validate_input_text(text: str, min_length: int = 50) -> tuple[bool, str]:
     Returns:
         tuple: (is_valid, error_message)
     """
-    if not text or not text.strip():
+    # Length without surrounding whitespace, found by index so the text is never copied
+    start, end = 0, len(text) if text else 0
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    
+    if start == end:
         return False, "Please enter some lecture content to process."
     
-    if len(text.strip()) < min_length:
+    if end - start < min_length:
         return False, f"Please enter at least {min_length} characters of lecture content."
     
     return True, ""
 
+_BYTES_TO_MB = 1 / (1024 * 1024)
+
 def get_file_size_mb(file_path: str) -> float:
-    """Get file size in megabytes"""
+    """Get file size in megabytes (0.0 if the file cannot be read)"""
     try:
-        return os.path.getsize(file_path) / (1024 * 1024)
-    except:
+        return os.stat(file_path).st_size * _BYTES_TO_MB
+    except OSError:
         return 0.0
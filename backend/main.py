@@ -3,168 +3,269 @@ FastAPI backend for LexiGraph
 Provides REST API for text-to-graph processing
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from typing import List, Optional
 import os
+import json
+import secrets
 import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from core.pipeline import pipeline, get_llm_instance
+from core.pipeline import run_pipeline, run_pipeline_many, get_llm_instance, warm_up_connections, clear_caches
 from core.utils import compile_dot_to_png, generate_unique_filename
 
-def process_lecture(text: str, provider: str, model: str, api_key: str):
+# Log level for the app and the core modules (LEXIGRAPH_LOG_LEVEL, default WARNING)
+logging.basicConfig(level=os.environ.get("LEXIGRAPH_LOG_LEVEL", "WARNING").upper())
+logger = logging.getLogger(__name__)
+
+# Directory for generated graph files (LEXIGRAPH_OUTPUT_DIR), resolved and created once at startup
+OUTPUT_DIR = Path(os.environ.get("LEXIGRAPH_OUTPUT_DIR", "output")).resolve()
+OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+def _graph_result(summary: str, dot_code: str):
     """
-    Wrapper function for the core pipeline that matches the FastAPI interface
+    Compile the pipeline output into the graph result returned to the frontend
     
     Args:
-        text (str): Input text to process
-        provider (str): AI provider to use
-        model (str): Model name to use
-        api_key (str): API key for the provider
+        summary (str): Summary (or error message) from the pipeline
+        dot_code (str): DOT code from the pipeline, None on failure
         
     Returns:
         dict: Result with success status, graph_path, and error info
     """
-    try:
-        # Validate API key
-        if not api_key or not api_key.strip():
-            return {
-                "success": False,
-                "error": f"API key is required for {provider}. Please enter your {provider} API key."
-            }
+    if dot_code and "digraph" in dot_code:
+        logger.debug("✅ Pipeline generated valid DOT code")
+        # Generate unique filename and compile to PNG
+        filename = generate_unique_filename()
+        logger.debug("📝 Generated filename: %s", filename)
         
-        # Validate API key format based on provider
-        validation_patterns = {
-            "anthropic": "sk-ant-",
-            "openai": "sk-",
-            "openrouter": "sk-or-"
-        }
+        logger.debug("📁 Output directory: %s", OUTPUT_DIR)
         
-        if provider.lower() in validation_patterns:
-            expected_pattern = validation_patterns[provider.lower()]
-            if not api_key.startswith(expected_pattern):
-                return {
-                    "success": False,
-                    "error": f"Invalid {provider} API key format. {provider} API keys should start with '{expected_pattern}'"
-                }
+        logger.debug("🔧 Starting DOT to PNG compilation...")
+        result_path, base64_data = compile_dot_to_png(dot_code, filename, str(OUTPUT_DIR))
         
-        # Set environment variables for provider selection
-        os.environ['PROVIDER'] = provider.lower()
-        os.environ['MODEL_NAME'] = model
-        
-        # Set the appropriate API key environment variable
-        if provider.lower() == "anthropic":
-            os.environ['ANTHROPIC_API_KEY'] = api_key
-        elif provider.lower() == "openai":
-            os.environ['OPENAI_API_KEY'] = api_key
-        elif provider.lower() == "openrouter":
-            os.environ['OPENROUTER_API_KEY'] = api_key
-        else:
+        if result_path or base64_data:
+            graph_path = f"{filename}.png"
+            logger.info("✅ Graph generation successful: %s", graph_path)
             return {
-                "success": False,
-                "error": f"Provider '{provider}' is not supported. Please select Anthropic, OpenAI, or OpenRouter."
+                "success": True,
+                "graph_path": graph_path,
+                "summary": summary,
+                "graph_data": base64_data
             }
-        
-        # Call the core pipeline
-        print(f"🚀 Starting pipeline with provider: {provider}, model: {model}")
-        summary, dot_code = pipeline(text)
-        
-        if dot_code and "digraph" in dot_code:
-            print("✅ Pipeline generated valid DOT code")
-            # Generate unique filename and compile to PNG
-            filename = generate_unique_filename()
-            print(f"📝 Generated filename: {filename}")
-            
-            # Ensure output directory exists
-            output_dir = Path("output")
-            output_dir.mkdir(exist_ok=True)
-            print(f"📁 Output directory: {output_dir.absolute()}")
-            
-            print("🔧 Starting DOT to PNG compilation...")
-            result_path, base64_data = compile_dot_to_png(dot_code, filename, str(output_dir))
-            
-            if result_path or base64_data:
-                graph_path = f"{filename}.png"
-                print(f"✅ Graph generation successful: {graph_path}")
-                return {
-                    "success": True,
-                    "graph_path": graph_path,
-                    "summary": summary,
-                    "graph_data": base64_data
-                }
-            else:
-                error_msg = "Failed to generate the graph image. The AI model may have produced invalid graph code. Please try again with different content or a different model."
-                print(f"❌ Failed to compile DOT code to PNG - check console for detailed error messages")
-                return {
-                    "success": False,
-                    "error": error_msg
-                }
         else:
-            error_msg = f"Unable to generate a valid knowledge graph from the provided content. Please try with different text or select a different AI model."
-            print(f"❌ Pipeline failed to generate valid DOT code. Generated content: {str(dot_code)[:200]}...")
+            error_msg = "Failed to generate the graph image. The AI model may have produced invalid graph code. Please try again with different content or a different model."
+            logger.warning("❌ Failed to compile DOT code to PNG - see the core.utils log for details")
             return {
                 "success": False,
                 "error": error_msg
             }
-            
-    except Exception as e:
-        # Log detailed error for debugging
-        detailed_error = f"❌ Pipeline execution failed: {str(e)}"
-        print(detailed_error)
+    else:
+        error_msg = f"Unable to generate a valid knowledge graph from the provided content. Please try with different text or select a different AI model."
+        logger.warning("❌ Pipeline failed to generate valid DOT code. Generated content: %.200s...", dot_code)
+        return {
+            "success": False,
+            "error": error_msg
+        }
+
+def _unexpected_error_result(e: Exception):
+    """
+    Log an unexpected processing failure and map it to a user-friendly error result
+    
+    Args:
+        e (Exception): The exception raised while processing
         
-        # Print detailed exception information for debugging
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+    Returns:
+        dict: Result with success status False and the error message
+    """
+    # Log detailed error with the full traceback for debugging
+    logger.exception("❌ Pipeline execution failed: %s", e)
+    
+    # Provide user-friendly error message
+    user_friendly_error = "An unexpected error occurred while processing your content. Please try again with different text or select a different AI model."
+    
+    # Handle specific common errors with better messages
+    error_str = str(e).lower()
+    if "rate limit" in error_str or "quota" in error_str:
+        user_friendly_error = "API rate limit reached. Please wait a moment and try again."
+    elif "api key" in error_str or "authentication" in error_str:
+        user_friendly_error = "Authentication failed. Please check your API key and try again."
+    elif "model" in error_str and "not found" in error_str:
+        user_friendly_error = "The selected AI model is not available. Please try a different model."
+    elif "timeout" in error_str:
+        user_friendly_error = "The request timed out. Please try again with shorter content."
+    elif "max_tokens" in error_str:
+        user_friendly_error = "The content is too long for the selected model. Please try shorter content or a different model."
+    
+    return {
+        "success": False,
+        "error": user_friendly_error
+    }
+
+async def process_lecture_async(text: str, provider: str, model: str, api_key: str, progress_callback=None):
+    """
+    Run the core pipeline for a FastAPI request without holding a worker thread
+    while the LLM calls are in flight
+    
+    Args:
+        text (str): Input text to process
+        provider (str): AI provider to use
+        model (str): Model name to use
+        api_key (str): API key for the provider
+        progress_callback (callable): Optional callback for pipeline progress updates
         
-        # Provide user-friendly error message
-        user_friendly_error = "An unexpected error occurred while processing your content. Please try again with different text or select a different AI model."
+    Returns:
+        dict: Result with success status, graph_path, and error info
+    """
+    try:
+        # Call the core pipeline with this request's configuration
+        logger.info("🚀 Starting pipeline with provider: %s, model: %s", provider, model)
+        summary, dot_code = await run_pipeline(text, progress_callback, provider=provider.lower(), model=model, api_key=api_key)
         
-        # Handle specific common errors with better messages
-        error_str = str(e).lower()
-        if "rate limit" in error_str or "quota" in error_str:
-            user_friendly_error = "API rate limit reached. Please wait a moment and try again."
-        elif "api key" in error_str or "authentication" in error_str:
-            user_friendly_error = "Authentication failed. Please check your API key and try again."
-        elif "model" in error_str and "not found" in error_str:
-            user_friendly_error = "The selected AI model is not available. Please try a different model."
-        elif "timeout" in error_str:
-            user_friendly_error = "The request timed out. Please try again with shorter content."
-        elif "max_tokens" in error_str:
-            user_friendly_error = "The content is too long for the selected model. Please try shorter content or a different model."
+        # DOT cleaning and validation are CPU work, so keep them off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _graph_result, summary, dot_code)
+            
+    except Exception as e:
+        return _unexpected_error_result(e)
+
+async def process_lectures_async(items: list):
+    """
+    Run the core pipeline for several lectures concurrently, grouped by configuration
+    
+    Args:
+        items (list): TextInput entries to process
         
-        return {
-            "success": False,
-            "error": user_friendly_error
-        }
+    Returns:
+        list[dict]: One result per item, in order
+    """
+    results = [None] * len(items)
+    loop = asyncio.get_running_loop()
+    
+    # Each group is one provider configuration, processed as one pipeline batch
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault((item.provider.lower(), item.model, item.api_key), []).append(index)
+    
+    async def run_group(provider, model, api_key, indices):
+        try:
+            logger.info("🚀 Starting batch pipeline with provider: %s, model: %s, lectures: %d", provider, model, len(indices))
+            outputs = await run_pipeline_many([items[index].text for index in indices], provider=provider, model=model, api_key=api_key)
+            
+            for index, (summary, dot_code) in zip(indices, outputs):
+                results[index] = await loop.run_in_executor(None, _graph_result, summary, dot_code)
+                
+        except Exception as e:
+            error_result = _unexpected_error_result(e)
+            for index in indices:
+                results[index] = error_result
+    
+    await asyncio.gather(*(run_group(*config, indices) for config, indices in groups.items()))
+    return results
+
+def process_lecture(text: str, provider: str, model: str, api_key: str):
+    """
+    Synchronous wrapper around process_lecture_async for scripts and tests
+    
+    Args:
+        text (str): Input text to process
+        provider (str): AI provider to use
+        model (str): Model name to use
+        api_key (str): API key for the provider
+        
+    Returns:
+        dict: Result with success status, graph_path, and error info
+    """
+    return asyncio.run(process_lecture_async(text, provider, model, api_key))
+
+# Worker threads for blocking request handling; bounded so a burst of requests queues
+# up instead of starving the event loop
+THREAD_POOL_SIZE = int(os.environ.get("LEXIGRAPH_THREAD_POOL_SIZE", "16"))
+
+# Warm up provider connections at startup; set to false when outbound calls at boot are unwanted
+WARM_UP_CONNECTIONS = os.environ.get("LEXIGRAPH_WARM_UP", "true").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    executor = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="lexi-llm")
+    asyncio.get_running_loop().set_default_executor(executor)
+    
+    # Open connections to the configured providers in the background so the first request
+    # skips the TLS handshake (LEXIGRAPH_WARM_UP=false turns this off, e.g. in offline deployments)
+    if WARM_UP_CONNECTIONS:
+        warm_up_connections()
+    yield
+    
+    executor.shutdown(wait=True)
 
 app = FastAPI(
     title="LexiGraph API",
     description="Transform lecture text into interactive concept graphs",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Enable CORS for frontend
+# Enable CORS for frontend; LEXIGRAPH_CORS takes a comma-separated list of origins
+DEFAULT_ALLOWED_ORIGINS = [
+    "http://localhost:3000",  # Local development
+    "http://127.0.0.1:3000",  # Local development alt
+    "*"  # Allow all origins for now - you can restrict this later
+]
+ALLOWED_ORIGINS = [
+    origin.strip() for origin in os.environ.get("LEXIGRAPH_CORS", "").split(",") if origin.strip()
+] or DEFAULT_ALLOWED_ORIGINS
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",  # Local development
-        "http://127.0.0.1:3000",  # Local development alt
-        "*"  # Allow all origins for now - you can restrict this later
-    ],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Expected API key prefix for each supported provider
+API_KEY_PREFIXES = {
+    "anthropic": "sk-ant-",
+    "openai": "sk-",
+    "openrouter": "sk-or-"
+}
+
 class TextInput(BaseModel):
     text: str
     provider: str = "anthropic"
     model: str = "claude-3-5-haiku-20241022"
     api_key: str
+    
+    # Rejected here so FastAPI answers 422 before any pipeline work is scheduled
+    @field_validator("provider")
+    @classmethod
+    def check_provider(cls, provider: str) -> str:
+        if provider.lower() not in API_KEY_PREFIXES:
+            raise ValueError(f"Provider '{provider}' is not supported. Please select Anthropic, OpenAI, or OpenRouter.")
+        return provider
+    
+    @field_validator("api_key")
+    @classmethod
+    def check_api_key(cls, api_key: str, info: ValidationInfo) -> str:
+        # Provider is validated first; skip the format check if it was rejected
+        provider = info.data.get("provider")
+        if provider is None:
+            return api_key
+        
+        if not api_key.strip():
+            raise ValueError(f"API key is required for {provider}. Please enter your {provider} API key.")
+        
+        expected_prefix = API_KEY_PREFIXES[provider.lower()]
+        if not api_key.startswith(expected_prefix):
+            raise ValueError(f"Invalid {provider} API key format. {provider} API keys should start with '{expected_prefix}'")
+        return api_key
 
 class ProcessResponse(BaseModel):
     success: bool
@@ -174,156 +275,295 @@ class ProcessResponse(BaseModel):
     error: Optional[str] = None
     graph_data: Optional[str] = None  # base64 encoded image data
 
-@app.get("/")
+class BatchTextInput(BaseModel):
+    items: List[TextInput] = Field(..., min_length=1, max_length=64)
+
+class BatchProcessResponse(BaseModel):
+    results: List[ProcessResponse]
+
+class MessageResponse(BaseModel):
+    message: str
+
+class OptionInfo(BaseModel):
+    id: str
+    name: str
+
+class ProvidersResponse(BaseModel):
+    providers: List[OptionInfo]
+
+class ModelsResponse(BaseModel):
+    models: List[OptionInfo]
+
+PROVIDERS = [
+    {"id": "openrouter", "name": "OpenRouter"},
+    {"id": "anthropic", "name": "Anthropic"},
+    {"id": "openai", "name": "OpenAI"}
+]
+
+PROVIDER_MODELS = {
+    "anthropic": [
+        {"id": "claude-opus-4-1-20250805", "name": "Claude Opus 4.1"},
+        {"id": "claude-opus-4-20250514", "name": "Claude Opus 4"},
+        {"id": "claude-sonnet-4-20250514", "name": "Claude Sonnet 4"},
+        {"id": "claude-3-7-sonnet-20250219", "name": "Claude Sonnet 3.7"},
+        {"id": "claude-3-5-haiku-20241022", "name": "Claude Haiku 3.5"}
+    ],
+    "openai": [
+        {"id": "gpt-5", "name": "GPT-5"},
+        {"id": "gpt-4.1", "name": "GPT-4.1"},
+        {"id": "gpt-4o", "name": "GPT-4o"},
+        {"id": "gpt-4o-mini", "name": "GPT-4o Mini"},
+        {"id": "gpt-4-turbo", "name": "GPT-4 Turbo"}
+    ],
+    "openrouter": [
+        # Free models
+        {"id": "deepseek/deepseek-chat-v3-0324:free", "name": "DeepSeek Chat v3 (Free)"},
+        {"id": "deepseek/deepseek-r1-0528:free", "name": "DeepSeek R1 0528 (Free)"},
+        {"id": "qwen/qwen3-coder:free", "name": "Qwen 3 Coder (Free)"},
+        {"id": "deepseek/deepseek-r1:free", "name": "DeepSeek R1 (Free)"},
+        {"id": "moonshotai/kimi-k2:free", "name": "Kimi K2 (Free)"},
+        {"id": "qwen/qwen3-235b-a22b:free", "name": "Qwen 3 235B (Free)"},
+        {"id": "meta-llama/llama-3.3-70b-instruct:free", "name": "Llama 3.3 70B Instruct (Free)"},
+        {"id": "google/gemma-3n-e4b-it:free", "name": "Gemma 3N E4B IT (Free)"},
+        {"id": "mistralai/mistral-small-3.1-24b-instruct:free", "name": "Mistral Small 3.1 24B (Free)"},
+        {"id": "openai/gpt-oss-20b:free", "name": "GPT OSS 20B (Free)"},
+        {"id": "google/gemma-3n-e2b-it:free", "name": "Gemma 3N E2B IT (Free)"},
+        {"id": "meta-llama/llama-3.2-3b-instruct:free", "name": "Llama 3.2 3B Instruct (Free)"},
+        {"id": "qwen/qwen3-4b:free", "name": "Qwen 3 4B (Free)"},
+        {"id": "mistralai/mistral-7b-instruct:free", "name": "Mistral 7B Instruct (Free)"},
+        {"id": "google/gemma-2-9b-it:free", "name": "Gemma 2 9B IT (Free)"},
+        {"id": "google/gemma-3-27b-it:free", "name": "Gemma 3 27B IT (Free)"},
+        # Anthropic models via OpenRouter
+        {"id": "anthropic/claude-opus-4-1-20250805", "name": "Claude Opus 4.1 (OpenRouter)"},
+        {"id": "anthropic/claude-opus-4-20250514", "name": "Claude Opus 4 (OpenRouter)"},
+        {"id": "anthropic/claude-sonnet-4-20250514", "name": "Claude Sonnet 4 (OpenRouter)"},
+        {"id": "anthropic/claude-3-7-sonnet-20250219", "name": "Claude Sonnet 3.7 (OpenRouter)"},
+        {"id": "anthropic/claude-3-5-haiku-20241022", "name": "Claude Haiku 3.5 (OpenRouter)"},
+        # OpenAI models via OpenRouter
+        {"id": "openai/gpt-5", "name": "GPT-5 (OpenRouter)"},
+        {"id": "openai/gpt-4.1", "name": "GPT-4.1 (OpenRouter)"},
+        {"id": "openai/gpt-4o", "name": "GPT-4o (OpenRouter)"},
+        {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini (OpenRouter)"},
+        {"id": "openai/gpt-4-turbo", "name": "GPT-4 Turbo (OpenRouter)"}
+    ]
+}
+
+# The provider and model lists never change at runtime, so they are serialized once
+_PROVIDERS_JSON = ProvidersResponse(providers=PROVIDERS).model_dump_json()
+_MODELS_JSON = {
+    provider: ModelsResponse(models=models).model_dump_json()
+    for provider, models in PROVIDER_MODELS.items()
+}
+
+def _process_response(result: dict) -> ProcessResponse:
+    """Convert a process_lecture result into the API response model"""
+    if result["success"]:
+        return ProcessResponse(
+            success=True,
+            message="Graph generated successfully",
+            graph_path=result.get("graph_path"),
+            summary=result.get("summary"),
+            graph_data=result.get("graph_data")
+        )
+    else:
+        return ProcessResponse(
+            success=False,
+            message="Failed to generate graph",
+            error=result.get("error")
+        )
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """Report request validation errors as one readable message, which the frontend shows as-is"""
+    messages = [
+        str(error["ctx"]["error"]) if "error" in error.get("ctx", {}) else f"{error['loc'][-1]}: {error['msg']}"
+        for error in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": " ".join(messages)})
+
+@app.get("/", response_model=MessageResponse)
 async def root():
     """Health check endpoint"""
     return {"message": "LexiGraph API is running"}
 
-@app.get("/providers")
+@app.get("/providers", response_model=ProvidersResponse)
 async def get_providers():
     """Get available AI providers"""
-    return {
-        "providers": [
-            {"id": "openrouter", "name": "OpenRouter"},
-            {"id": "anthropic", "name": "Anthropic"},
-            {"id": "openai", "name": "OpenAI"}
-        ]
-    }
+    return Response(content=_PROVIDERS_JSON, media_type="application/json")
 
-@app.get("/models/{provider}")
+@app.get("/models/{provider}", response_model=ModelsResponse)
 async def get_models(provider: str):
     """Get available models for a specific provider"""
-    models = {
-        "anthropic": [
-            {"id": "claude-opus-4-1-20250805", "name": "Claude Opus 4.1"},
-            {"id": "claude-opus-4-20250514", "name": "Claude Opus 4"},
-            {"id": "claude-sonnet-4-20250514", "name": "Claude Sonnet 4"},
-            {"id": "claude-3-7-sonnet-20250219", "name": "Claude Sonnet 3.7"},
-            {"id": "claude-3-5-haiku-20241022", "name": "Claude Haiku 3.5"}
-        ],
-        "openai": [
-            {"id": "gpt-5", "name": "GPT-5"},
-            {"id": "gpt-4.1", "name": "GPT-4.1"},
-            {"id": "gpt-4o", "name": "GPT-4o"},
-            {"id": "gpt-4o-mini", "name": "GPT-4o Mini"},
-            {"id": "gpt-4-turbo", "name": "GPT-4 Turbo"}
-        ],
-        "openrouter": [
-            # Free models
-            {"id": "deepseek/deepseek-chat-v3-0324:free", "name": "DeepSeek Chat v3 (Free)"},
-            {"id": "deepseek/deepseek-r1-0528:free", "name": "DeepSeek R1 0528 (Free)"},
-            {"id": "qwen/qwen3-coder:free", "name": "Qwen 3 Coder (Free)"},
-            {"id": "deepseek/deepseek-r1:free", "name": "DeepSeek R1 (Free)"},
-            {"id": "moonshotai/kimi-k2:free", "name": "Kimi K2 (Free)"},
-            {"id": "qwen/qwen3-235b-a22b:free", "name": "Qwen 3 235B (Free)"},
-            {"id": "meta-llama/llama-3.3-70b-instruct:free", "name": "Llama 3.3 70B Instruct (Free)"},
-            {"id": "google/gemma-3n-e4b-it:free", "name": "Gemma 3N E4B IT (Free)"},
-            {"id": "mistralai/mistral-small-3.1-24b-instruct:free", "name": "Mistral Small 3.1 24B (Free)"},
-            {"id": "openai/gpt-oss-20b:free", "name": "GPT OSS 20B (Free)"},
-            {"id": "google/gemma-3n-e2b-it:free", "name": "Gemma 3N E2B IT (Free)"},
-            {"id": "meta-llama/llama-3.2-3b-instruct:free", "name": "Llama 3.2 3B Instruct (Free)"},
-            {"id": "qwen/qwen3-4b:free", "name": "Qwen 3 4B (Free)"},
-            {"id": "mistralai/mistral-7b-instruct:free", "name": "Mistral 7B Instruct (Free)"},
-            {"id": "google/gemma-2-9b-it:free", "name": "Gemma 2 9B IT (Free)"},
-            {"id": "google/gemma-3-27b-it:free", "name": "Gemma 3 27B IT (Free)"},
-            # Anthropic models via OpenRouter
-            {"id": "anthropic/claude-opus-4-1-20250805", "name": "Claude Opus 4.1 (OpenRouter)"},
-            {"id": "anthropic/claude-opus-4-20250514", "name": "Claude Opus 4 (OpenRouter)"},
-            {"id": "anthropic/claude-sonnet-4-20250514", "name": "Claude Sonnet 4 (OpenRouter)"},
-            {"id": "anthropic/claude-3-7-sonnet-20250219", "name": "Claude Sonnet 3.7 (OpenRouter)"},
-            {"id": "anthropic/claude-3-5-haiku-20241022", "name": "Claude Haiku 3.5 (OpenRouter)"},
-            # OpenAI models via OpenRouter
-            {"id": "openai/gpt-5", "name": "GPT-5 (OpenRouter)"},
-            {"id": "openai/gpt-4.1", "name": "GPT-4.1 (OpenRouter)"},
-            {"id": "openai/gpt-4o", "name": "GPT-4o (OpenRouter)"},
-            {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini (OpenRouter)"},
-            {"id": "openai/gpt-4-turbo", "name": "GPT-4 Turbo (OpenRouter)"}
-        ]
-    }
-    
-    if provider.lower() not in models:
+    models_json = _MODELS_JSON.get(provider.lower())
+    if models_json is None:
         raise HTTPException(status_code=404, detail=f"Provider {provider} not found")
     
-    return {"models": models[provider.lower()]}
+    return Response(content=models_json, media_type="application/json")
 
 @app.post("/process/text", response_model=ProcessResponse)
 async def process_text(input_data: TextInput):
     """Process text input and generate concept graph"""
     try:
-        # Run the pipeline in a separate thread to avoid blocking
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, 
-            process_lecture, 
+        result = await process_lecture_async(
             input_data.text, 
             input_data.provider,
             input_data.model,
             input_data.api_key
         )
         
-        if result["success"]:
-            return ProcessResponse(
-                success=True,
-                message="Graph generated successfully",
-                graph_path=result.get("graph_path"),
-                summary=result.get("summary"),
-                graph_data=result.get("graph_data")
-            )
-        else:
-            return ProcessResponse(
-                success=False,
-                message="Failed to generate graph",
-                error=result.get("error")
-            )
+        return _process_response(result)
+            
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse_event(event: str, data: str) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+@app.post("/process/text/stream")
+async def process_text_stream(input_data: TextInput):
+    """
+    Process text input like /process/text, streaming progress as Server-Sent Events
+    
+    Sends a `progress` event ({"stage", "message"}) for each pipeline step and, while the
+    summary and DOT code are generated, a character count per completed line (the text
+    itself is not streamed), then one `result` event with the ProcessResponse
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    
+    # The pipeline reports progress from its own event loop thread
+    def on_progress(stage, message):
+        loop.call_soon_threadsafe(events.put_nowait, (stage, message))
+    
+    async def event_stream():
+        task = asyncio.create_task(process_lecture_async(
+            input_data.text,
+            input_data.provider,
+            input_data.model,
+            input_data.api_key,
+            on_progress
+        ))
+        # Queued after every progress event the pipeline sent before finishing
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        
+        try:
+            while (event := await events.get()) is not None:
+                stage, message = event
+                yield _sse_event("progress", json.dumps({"stage": stage, "message": message}, ensure_ascii=False))
             
+            yield _sse_event("result", _process_response(task.result()).model_dump_json())
+        finally:
+            # Stop the pipeline if the client disconnected before the result
+            task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/process/batch", response_model=BatchProcessResponse)
+async def process_batch(input_data: BatchTextInput):
+    """Process up to 64 text inputs in one request, sharing LLM calls across lectures"""
+    try:
+        results = await process_lectures_async(input_data.items)
+        return BatchProcessResponse(results=[_process_response(result) for result in results])
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Token for admin endpoints (LEXIGRAPH_ADMIN_TOKEN); when unset they are disabled
+ADMIN_TOKEN = os.environ.get("LEXIGRAPH_ADMIN_TOKEN", "")
+
+def _require_admin(request: Request):
+    """Reject the request unless it carries the admin token as a bearer token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+@app.delete("/cache", response_model=MessageResponse)
+async def clear_cache(request: Request):
+    """Clear cached pipeline results so the next request for a lecture calls the models again (admin only)"""
+    _require_admin(request)
+    clear_caches()
+    return {"message": "Cache cleared"}
+
+# Graph filenames are never reused, so browsers may keep an image for good
+GRAPH_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def _file_cache_headers(stat_result: os.stat_result) -> dict:
+    """ETag (from modification time and size) and Cache-Control headers for a served graph file"""
+    return {
+        "ETag": f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+        "Cache-Control": GRAPH_CACHE_CONTROL
+    }
+
+def _is_not_modified(request: Request, headers: dict) -> bool:
+    """Check whether the client's If-None-Match already names the current version of the file"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or headers["ETag"] in tags
+
 @app.get("/image/{filename}")
-async def serve_image(filename: str):
+async def serve_image(filename: str, request: Request):
     """Serve image file for display in the frontend"""
     try:
         # Look for the file in the output directory
-        output_dir = Path("output")
-        file_path = output_dir / filename
+        file_path = OUTPUT_DIR / filename
         
-        print(f"Looking for image file: {file_path}")
-        print(f"File exists: {file_path.exists()}")
+        logger.debug("Looking for image file: %s", file_path)
         
-        if not file_path.exists():
+        try:
+            stat_result = file_path.stat()
+        except FileNotFoundError:
             # List available files for debugging
-            if output_dir.exists():
-                files = list(output_dir.glob("*.png"))
-                print(f"Available files: {files}")
-            else:
-                print(f"Output directory {output_dir} does not exist")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Available files: %s", list(OUTPUT_DIR.glob("*.png")))
             raise HTTPException(status_code=404, detail="Image file not found")
         
+        headers = _file_cache_headers(stat_result)
+        if _is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        
         return FileResponse(
             path=str(file_path),
-            media_type='image/png'
+            media_type='image/png',
+            headers=headers,
+            stat_result=stat_result
         )
         
     except Exception as e:
-        print(f"Error serving image: {e}")
+        logger.error("Error serving image: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/download/{filename}")
-async def download_graph(filename: str):
+async def download_graph(filename: str, request: Request):
     """Download generated graph file"""
     try:
         # Look for the file in the output directory
-        output_dir = Path("output")
-        file_path = output_dir / filename
+        file_path = OUTPUT_DIR / filename
         
-        if not file_path.exists():
+        try:
+            stat_result = file_path.stat()
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="File not found")
         
+        headers = _file_cache_headers(stat_result)
+        if _is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        
         return FileResponse(
             path=str(file_path),
             filename=filename,
             media_type='image/png',
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers={**headers, "Content-Disposition": f"attachment; filename={filename}"},
+            stat_result=stat_result
         )
         
     except Exception as e:
@@ -0,0 +1,79 @@
+"""
+Tests for the caches in core.cache
+Run from the backend directory: python -m unittest discover -s tests -t .
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core.cache import DiskCache, LRUCache
+
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+
+    def _set_mtime(self, cache, key, mtime):
+        os.utime(cache._path(key), (mtime, mtime))
+
+    def test_round_trip(self):
+        cache = DiskCache(self.directory)
+        cache.set("a", ["summary", "digraph G {}"])
+        self.assertEqual(cache.get("a"), ("summary", "digraph G {}"))
+        self.assertIsNone(cache.get("missing"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = DiskCache(self.directory, max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        self._set_mtime(cache, "a", 1000)
+        self._set_mtime(cache, "b", 2000)
+        # Reading "a" makes it the most recently used entry
+        cache.get("a")
+        cache.set("c", "3")
+        
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.endswith(".json")]), 2)
+
+    def test_failed_write_leaves_no_temp_file(self):
+        cache = DiskCache(self.directory)
+        with mock.patch("core.cache.os.replace", side_effect=OSError("disk full")):
+            cache.set("a", "1")
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_unserializable_value_leaves_no_temp_file(self):
+        cache = DiskCache(self.directory)
+        with self.assertRaises(TypeError):
+            cache.set("a", object())
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_oldest_entry_is_evicted(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_discard_removes_from_backing_cache(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        directory = temp_dir.name
+        cache = LRUCache(backing=DiskCache(directory))
+        cache.set("a", "1")
+        cache.discard("a")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(os.listdir(directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
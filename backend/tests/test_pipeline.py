@@ -0,0 +1,250 @@
+"""
+Tests for the local helpers in core.pipeline (no LLM calls)
+Run from the backend directory: python -m unittest discover -s tests -t .
+"""
+
+import asyncio
+import functools
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import RunnableGenerator, RunnableLambda
+
+from core import pipeline
+from core.cache import make_cache_key
+from core.ratelimit import AsyncRateLimiter, retry_async
+from core.pipeline import get_example_lecture, precheck_content
+
+
+def _transcript(lines: list[str], repeat: int = 6) -> str:
+    return "\n".join(lines * repeat)
+
+
+class PrecheckContentTest(unittest.TestCase):
+    def test_short_input_is_rejected(self):
+        self.assertIs(precheck_content("Just a few words."), False)
+
+    def test_example_lecture_is_accepted(self):
+        self.assertIs(precheck_content(get_example_lecture()), True)
+
+    def test_timestamped_lecture_transcript_is_not_rejected(self):
+        text = _transcript([
+            "00:01 Professor: Today's lecture is an introduction to sorting algorithms.",
+            "00:45 Professor: A sorting algorithm is defined as a procedure that orders a list.",
+            "01:30 Student: Is bubble sort an example of that?",
+            "02:10 Professor: Yes, and we will compare it with merge sort in this chapter.",
+        ])
+        self.assertIsNot(precheck_content(text), False)
+
+    def test_bracketed_timestamps_are_not_rejected(self):
+        text = _transcript([
+            "[1:00] Note: photosynthesis converts light energy into chemical energy in plants.",
+            "[2:00] Note: chlorophyll absorbs mostly red and blue light from the sun.",
+            "[3:00] Note: the light reactions take place in the thylakoid membranes.",
+        ])
+        self.assertIsNot(precheck_content(text), False)
+
+    def test_chat_log_is_left_to_the_validation_agent(self):
+        text = _transcript([
+            "10:02 Sam: are we still on for dinner tonight at the usual place",
+            "10:05 Alex: yes but I might be a bit late because of traffic",
+            "10:06 Sam: no worries just text me when you are close by",
+        ])
+        self.assertIsNone(precheck_content(text))
+
+
+class SplitValidationTagTest(unittest.TestCase):
+    def test_valid_tag_is_removed(self):
+        self.assertEqual(pipeline._split_validation_tag("VALID\nAI:\n- ML"), (True, "AI:\n- ML"))
+
+    def test_invalid_tag(self):
+        self.assertEqual(pipeline._split_validation_tag("  invalid\nnot a lecture"), (False, ""))
+
+    def test_tag_with_decoration(self):
+        self.assertEqual(pipeline._split_validation_tag("**VALID**\nAI:"), (True, "AI:"))
+
+    def test_untagged_response_is_a_summary(self):
+        self.assertEqual(pipeline._split_validation_tag("AI:\n- ML\n"), (True, "AI:\n- ML"))
+
+    def test_tag_only(self):
+        self.assertEqual(pipeline._split_validation_tag("VALID"), (True, ""))
+
+    def test_heading_containing_invalid_is_kept(self):
+        response = "Cache Invalidation Strategies:\n- Write-through"
+        self.assertEqual(pipeline._split_validation_tag(response), (True, response))
+
+    def test_heading_containing_valid_is_kept(self):
+        response = "Cross-Validation Techniques:\n- K-fold"
+        self.assertEqual(pipeline._split_validation_tag(response), (True, response))
+
+    def test_tag_with_trailing_punctuation(self):
+        self.assertEqual(pipeline._split_validation_tag("INVALID."), (False, ""))
+
+
+def _streaming_agent(chunks: list[str], sent: list):
+    """Fake chat model streaming the given chunks and recording how many were consumed"""
+    async def generate(_):
+        for chunk in chunks:
+            sent.append(chunk)
+            yield AIMessageChunk(content=chunk)
+    return RunnableGenerator(generate)
+
+
+class FusedSummaryStreamTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        pipeline.clear_caches()
+        self.addCleanup(pipeline.clear_caches)
+        patcher = mock.patch.object(pipeline, "FUSE_VALIDATION", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _summarize(self, chunks):
+        sent = []
+        agent = _streaming_agent(chunks, sent)
+        with mock.patch.object(pipeline, "_get_agents", lambda *args: (agent, agent, agent)):
+            result = await pipeline.summarize_async(get_example_lecture(), provider="openai", model="gpt-4o-mini", api_key="sk-test")
+        return result, sent
+
+    async def test_invalid_tag_split_across_chunks_stops_the_stream(self):
+        chunks = ["IN", "VAL", "ID", "\nThis is", " not a lecture", "\n- more", "\n- text"]
+        result, sent = await self._summarize(chunks)
+        self.assertEqual(result, (False, pipeline.INVALID_CONTENT_ERROR))
+        self.assertLess(len(sent), len(chunks))
+
+    async def test_untagged_summary_with_invalid_in_heading_is_kept(self):
+        result, _ = await self._summarize(["Cache Inval", "idation Strategies:\n", "- Write-through"])
+        self.assertEqual(result, (True, "Cache Invalidation Strategies:\n- Write-through"))
+
+    async def test_valid_tag_split_across_chunks(self):
+        result, _ = await self._summarize(["VA", "LI", "D\nArtificial", " Intelligence:\n- ", "Definition"])
+        self.assertEqual(result, (True, "Artificial Intelligence:\n- Definition"))
+
+
+class GraphStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def _generate(self, chunks):
+        sent = []
+        agent = _streaming_agent(chunks, sent)
+        with mock.patch.object(pipeline, "_get_agents", lambda *args: (agent, agent, agent)):
+            result = await pipeline.generate_graph_async("AI:\n- ML", provider="openai", model="gpt-4o-mini", api_key="sk-test")
+        return result, sent
+
+    async def test_header_after_long_preamble(self):
+        preamble = ["Let me think about how to lay out this graph. " * 10] * 10
+        result, _ = await self._generate([*preamble, "digraph G {\n", "  A -> B;\n", "}\n"])
+        self.assertEqual(result, ("AI:\n- ML", "digraph G {\n  A -> B;\n}"))
+
+    async def test_prose_only_stops_at_the_search_limit(self):
+        chunks = ["No graph here. " * 10] * 20
+        with mock.patch.object(pipeline, "DOT_HEADER_SEARCH_CHARS", 500):
+            result, sent = await self._generate(chunks)
+        self.assertIsNone(result[1])
+        self.assertLess(len(sent), len(chunks))
+
+
+class StreamAgentTest(unittest.IsolatedAsyncioTestCase):
+    async def test_early_stop_closes_the_stream(self):
+        closed = []
+        
+        class Agent:
+            async def astream(self, messages):
+                try:
+                    for text in ["a", "b", "c"]:
+                        yield AIMessageChunk(content=text)
+                finally:
+                    closed.append(True)
+        
+        message = await pipeline._stream_agent(Agent(), [], on_chunk=lambda chunk, message: True)
+        self.assertEqual(message.content, "a")
+        self.assertEqual(closed, [True])
+
+
+class ResponseCacheKeyTest(unittest.TestCase):
+    def test_settings_that_change_output_change_the_key(self):
+        key = pipeline._response_cache_key("lecture", "openai", "gpt-4o-mini")
+        for setting, value in (
+            ("SUMMARIZATION_MODEL", "gpt-4o"),
+            ("VISUALIZATION_MODEL", "gpt-4o"),
+            ("VALIDATION_MODEL", "gpt-4o"),
+            ("FUSE_VALIDATION", not pipeline.FUSE_VALIDATION),
+            ("DOT_FROM_SUMMARY", not pipeline.DOT_FROM_SUMMARY),
+        ):
+            with self.subTest(setting=setting), mock.patch.object(pipeline, setting, value):
+                self.assertNotEqual(pipeline._response_cache_key("lecture", "openai", "gpt-4o-mini"), key)
+
+    def test_whitespace_and_case_share_a_key(self):
+        self.assertEqual(
+            pipeline._response_cache_key("Intro  to AI\n", "openai", "gpt-4o-mini"),
+            pipeline._response_cache_key("intro to ai", "openai", "gpt-4o-mini"),
+        )
+
+
+class AuthErrorEvictionTest(unittest.TestCase):
+    def setUp(self):
+        pipeline.AGENT_CACHE.clear()
+        self.addCleanup(pipeline.AGENT_CACHE.clear)
+
+    def test_only_the_failing_configuration_is_evicted(self):
+        bad_key = make_cache_key("openai", "gpt-4o-mini", "sk-bad")
+        good_key = make_cache_key("openai", "gpt-4o-mini", "sk-good")
+        pipeline.AGENT_CACHE.set(bad_key, ("bad",))
+        pipeline.AGENT_CACHE.set(good_key, ("good",))
+        
+        message = pipeline._pipeline_error(Exception("Invalid API key"), "openai", "gpt-4o-mini", "sk-bad")
+        
+        self.assertEqual(message, "Authentication failed. Please check your API key.")
+        self.assertIsNone(pipeline.AGENT_CACHE.get(bad_key))
+        self.assertEqual(pipeline.AGENT_CACHE.get(good_key), ("good",))
+
+
+class RateLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_limiter_does_not_bypass_the_global_one(self):
+        async def respond(messages):
+            return AIMessage(content="VALID")
+        agent = RunnableLambda(lambda messages: None, afunc=respond)
+        global_limiter = AsyncRateLimiter(10)
+        batch_limiter = AsyncRateLimiter(10)
+        
+        with mock.patch.object(pipeline, "LLM_RATE_LIMITER", global_limiter):
+            await pipeline._invoke_agent(agent, [], batch_limiter)
+        
+        self.assertLess(global_limiter._tokens, 10)
+        self.assertLess(batch_limiter._tokens, 10)
+
+    async def test_batch_semaphore_is_released_during_backoff(self):
+        attempts = []
+        async def respond(messages):
+            attempts.append(messages)
+            if len(attempts) == 1:
+                error = Exception("overloaded")
+                error.status_code = 503
+                raise error
+            return AIMessage(content="VALID")
+        agent = RunnableLambda(lambda messages: None, afunc=respond)
+        semaphore = asyncio.Semaphore(1)
+        
+        with mock.patch.object(pipeline, "retry_async", functools.partial(retry_async, initial_delay=0.5, max_delay=0.5)):
+            task = asyncio.create_task(pipeline._invoke_agent(agent, [], None, semaphore))
+            await asyncio.sleep(0.1)
+            self.assertEqual(len(attempts), 1)
+            self.assertFalse(semaphore.locked())
+            self.assertEqual((await task).content, "VALID")
+
+
+class WarmUpTest(unittest.TestCase):
+    
+    def test_only_configured_providers_are_warmed(self):
+        env = {"PROVIDER": "anthropic", "ANTHROPIC_API_KEY": "a", "OPENROUTER_API_KEY": "o"}
+        with mock.patch.dict("os.environ", env, clear=True):
+            self.assertEqual(pipeline.configured_providers(), {"anthropic", "openrouter"})
+    
+    def test_nothing_to_warm_up(self):
+        with mock.patch.dict("os.environ", {}, clear=True), \
+                mock.patch.object(pipeline, "_get_background_loop") as get_loop:
+            self.assertIsNone(pipeline.warm_up_connections())
+            self.assertIsNone(pipeline.warm_up_connections(["anthropic"]))
+        get_loop.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
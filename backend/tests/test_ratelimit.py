@@ -0,0 +1,43 @@
+"""
+Tests for the retry and rate limiting helpers in core.ratelimit
+Run from the backend directory: python -m unittest discover -s tests -t .
+"""
+
+import asyncio
+import unittest
+
+from core.ratelimit import AsyncRateLimiter, is_retryable_error
+
+
+class AsyncRateLimiterTest(unittest.TestCase):
+    def test_can_be_shared_by_several_event_loops(self):
+        limiter = AsyncRateLimiter(2, period=0.1)
+        
+        async def acquire_many():
+            await asyncio.gather(*(limiter.acquire() for _ in range(4)))
+        
+        # Waiting on the limiter from a second loop used to fail with "bound to a different event loop"
+        asyncio.run(acquire_many())
+        asyncio.run(acquire_many())
+
+    def test_zero_disables_the_limit(self):
+        limiter = AsyncRateLimiter(0)
+        
+        async def acquire_many():
+            await asyncio.gather(*(limiter.acquire() for _ in range(100)))
+        
+        asyncio.run(asyncio.wait_for(acquire_many(), 1))
+
+
+class IsRetryableErrorTest(unittest.TestCase):
+    def test_status_codes(self):
+        overloaded = Exception("overloaded")
+        overloaded.status_code = 529
+        bad_request = Exception("bad request")
+        bad_request.status_code = 400
+        self.assertTrue(is_retryable_error(overloaded))
+        self.assertFalse(is_retryable_error(bad_request))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Tests for the DOT helpers in core.utils
+Run from the backend directory: python -m unittest discover -s tests -t .
+"""
+
+import unittest
+
+from core.utils import (
+    DotStreamCleaner,
+    clean_dot_code,
+    fix_color_attributes,
+    fix_unsupported_colors,
+    summary_to_dot,
+    validate_dot_syntax,
+)
+
+
+class FixUnsupportedColorsTest(unittest.TestCase):
+    def test_graph_level_color_is_mapped(self):
+        dot = 'digraph G { bgcolor=lightgray; A -> B; }'
+        self.assertEqual(fix_unsupported_colors(dot), 'digraph G { bgcolor=white; A -> B; }')
+
+    def test_quoted_graph_level_color_keeps_quotes(self):
+        dot = 'digraph G { bgcolor="lightblue"; }'
+        self.assertEqual(fix_unsupported_colors(dot), 'digraph G { bgcolor="cyan"; }')
+
+    def test_node_color_gets_contrasting_fontcolor(self):
+        dot = 'digraph G { A [fillcolor=lightgreen, style=filled]; B [fillcolor=blue]; }'
+        self.assertEqual(
+            fix_unsupported_colors(dot),
+            'digraph G { A [fillcolor=yellow, style=filled, fontcolor=black]; B [fillcolor=blue, fontcolor=white]; }',
+        )
+
+    def test_supported_colors_are_untouched(self):
+        dot = 'digraph G { bgcolor=white; A -> B; }'
+        self.assertEqual(fix_unsupported_colors(dot), dot)
+
+
+class FixColorAttributesTest(unittest.TestCase):
+    def test_light_color_becomes_fillcolor(self):
+        dot = 'digraph G { node [style=filled]; A [color=lightblue]; }'
+        self.assertEqual(
+            fix_color_attributes(dot),
+            'digraph G { node [style=filled, fontcolor=black]; A [fillcolor=lightblue, fontcolor=black]; }',
+        )
+
+    def test_unfilled_graph_is_untouched(self):
+        dot = 'digraph G { A [color=lightblue]; }'
+        self.assertEqual(fix_color_attributes(dot), dot)
+
+
+class SummaryToDotTest(unittest.TestCase):
+    def test_hierarchy_becomes_nodes_and_edges(self):
+        dot = summary_to_dot("Machine Learning:\n- Supervised\n-- Regression\n- Unsupervised")
+        self.assertIn('n0 [label="Machine Learning", fillcolor=white];', dot)
+        self.assertIn('n2 [label="Regression", fillcolor=cyan];', dot)
+        for edge in ("n0 -> n1;", "n1 -> n2;", "n0 -> n3;"):
+            self.assertIn(edge, dot)
+        self.assertEqual(validate_dot_syntax(dot), (True, "Valid DOT syntax"))
+
+    def test_empty_or_flat_summary_gives_no_graph(self):
+        self.assertEqual(summary_to_dot(""), "")
+        self.assertEqual(summary_to_dot("\n  \n"), "")
+        self.assertEqual(summary_to_dot("Just one topic:\nAnother topic"), "")
+
+    def test_indented_and_empty_bullets(self):
+        dot = summary_to_dot("Topic:\n    - Child\n  -\n\t-- Grandchild")
+        self.assertEqual(dot.count("[label="), 3)
+        self.assertIn("n0 -> n1;", dot)
+        self.assertIn("n1 -> n2;", dot)
+
+    def test_skipped_level_attaches_to_nearest_ancestor(self):
+        dot = summary_to_dot("Topic:\n--- Deep detail")
+        self.assertIn("n0 -> n1;", dot)
+
+    def test_repeated_topic_reuses_its_node(self):
+        dot = summary_to_dot("AI:\n- Machine Learning\nMachine Learning:\n- Supervised")
+        self.assertEqual(dot.count("[label="), 3)
+        self.assertIn("n1 -> n2;", dot)
+
+    def test_quotes_and_backslashes_in_labels_are_escaped(self):
+        dot = summary_to_dot('Strings:\n- Written as "text" or C:\\path')
+        self.assertIn('label="Written as \\"text\\" or C:\\\\path"', dot)
+        self.assertEqual(validate_dot_syntax(dot), (True, "Valid DOT syntax"))
+
+    def test_long_labels_are_wrapped(self):
+        dot = summary_to_dot("Topic:\n- " + "word " * 20)
+        self.assertIn("\\n", dot)
+
+
+class DotStreamCleanerTest(unittest.TestCase):
+    def _feed_all(self, chunks):
+        cleaner = DotStreamCleaner()
+        for chunk in chunks:
+            cleaner.feed(chunk)
+        return cleaner
+
+    def test_fenced_dot_arriving_in_pieces(self):
+        cleaner = self._feed_all(["Here is the graph:\n``", "`dot\ndi", "graph G {\n  A -", "> B;\n", "}\n``", "`\nHope this helps"])
+        self.assertTrue(cleaner.complete)
+        self.assertEqual(cleaner.text, "digraph G {\n  A -> B;\n}")
+
+    def test_header_split_across_chunks(self):
+        cleaner = self._feed_all(["dig", "raph", " G ", "{ A; }"])
+        self.assertEqual(cleaner.text, "digraph G { A; }")
+
+    def test_braces_inside_labels_do_not_close_the_graph(self):
+        cleaner = self._feed_all(['digraph G { A [label="set {x}"]; ', 'B [label="say \\"}\\""]; }', " trailing"])
+        self.assertTrue(cleaner.complete)
+        self.assertEqual(cleaner.text, 'digraph G { A [label="set {x}"]; B [label="say \\"}\\""]; }')
+
+    def test_nested_subgraphs(self):
+        cleaner = self._feed_all(["digraph G { subgraph cluster_0 { A; }", " B; }"])
+        self.assertTrue(cleaner.complete)
+        self.assertTrue(cleaner.text.endswith("B; }"))
+
+    def test_incomplete_stream(self):
+        cleaner = self._feed_all(["digraph G { A -> B;"])
+        self.assertFalse(cleaner.complete)
+        self.assertEqual(cleaner.feed(""), "")
+
+    def test_prose_only_yields_nothing(self):
+        cleaner = self._feed_all(["I cannot draw a graph for this input."])
+        self.assertEqual(cleaner.text, "")
+
+
+class CleanDotCodeTest(unittest.TestCase):
+    def test_fenced_output(self):
+        self.assertEqual(clean_dot_code("```dot\ndigraph G { A -> B; }\n```"), "digraph G { A -> B; }")
+
+    def test_prose_around_graph(self):
+        self.assertEqual(clean_dot_code("Here's the DOT code: digraph G { A -> B; }"), "digraph G { A -> B; }")
+
+    def test_empty_output(self):
+        self.assertEqual(clean_dot_code("   "), "")
+
+
+if __name__ == "__main__":
+    unittest.main()